@@ -39,8 +39,6 @@ def _create_channel_for_scope(scope_type, scope_id):
         required_fields=['name', 'channel_type'],
         optional_fields=['enabled', 'is_default', 'events', 'config'],
     )
-    if isinstance(data, tuple):
-        return data
 
     channel_type_raw = str(data.get('channel_type') or '').strip().lower()
     if channel_type_raw not in SUPPORTED_NOTIFICATION_CHANNEL_TYPES:
@@ -140,8 +138,6 @@ def patch_channel(channel_id):
         return ApiResponse.forbidden('Access denied').to_response()
 
     data = validate_json_request(optional_fields=['name', 'enabled', 'is_default', 'events', 'config'])
-    if isinstance(data, tuple):
-        return data
 
     if 'name' in data:
         name = str(data.get('name') or '').strip()
@@ -48,8 +48,6 @@ def patch_runner_config(workspace_id, agent_id):
     data = validate_json_request(
         optional_fields=['execution_mode', 'runner_enabled', 'sandbox_profile', 'sandbox_policy']
     )
-    if isinstance(data, tuple):
-        return data
 
     if 'execution_mode' in data:
         execution_mode = str(data.get('execution_mode') or '').strip().lower()
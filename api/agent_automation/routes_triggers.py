@@ -61,8 +61,6 @@ def create_agent_trigger(workspace_id, agent_id):
             'dedup_window_seconds',
         ],
     )
-    if isinstance(data, tuple):
-        return data
 
     name = str(data.get('name') or '').strip()
     if not name:
@@ -158,8 +156,6 @@ def patch_agent_trigger(workspace_id, agent_id, trigger_id):
             'dedup_window_seconds',
         ]
     )
-    if isinstance(data, tuple):
-        return data
 
     if 'name' in data:
         name = str(data.get('name') or '').strip()
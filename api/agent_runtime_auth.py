@@ -14,8 +14,6 @@ agent_runtime_auth_bp = Blueprint('agent_runtime_auth', __name__)
 @agent_runtime_auth_bp.route('/agent/auth/introspect', methods=['POST'])
 def agent_auth_introspect():
     data = validate_json_request(required_fields=['agent_key'])
-    if isinstance(data, tuple):
-        return data
 
     raw_key = data['agent_key']
     key = AgentKey.verify_key(raw_key)
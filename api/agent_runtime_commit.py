@@ -26,8 +26,6 @@ agent_runtime_commit_bp = Blueprint('agent_runtime_commit', __name__)
 def emit_events(task_id):
     agent = g.current_agent
     data = validate_json_request(required_fields=['attempt_id', 'events'])
-    if isinstance(data, tuple):
-        return data
 
     attempt_id = data['attempt_id']
     events = data.get('events') or []
@@ -72,8 +70,6 @@ def emit_events(task_id):
 def commit_task(task_id):
     agent = g.current_agent
     data = validate_json_request(required_fields=['attempt_id', 'lease_id', 'status'])
-    if isinstance(data, tuple):
-        return data
 
     idem_key = request.headers.get('Idempotency-Key')
     if not idem_key:
@@ -74,8 +74,6 @@ def _query_receipts(agent_id, include_acked=False, max_items=20):
 def pull_agent_notifications():
     agent = g.current_agent
     data = validate_json_request(optional_fields=['max_items', 'wait_seconds', 'include_acked'])
-    if isinstance(data, tuple):
-        return data
 
     max_items = _normalize_int(data.get('max_items', 20), 20, min_value=1, max_value=100)
     wait_seconds = _normalize_int(data.get('wait_seconds', 0), 0, min_value=0, max_value=20)
@@ -103,8 +103,6 @@ def _fetch_next_task(agent):
 def pull_tasks():
     agent = g.current_agent
     data = validate_json_request(optional_fields=['max_tasks'])
-    if isinstance(data, tuple):
-        return data
 
     max_tasks = 1
     if data and 'max_tasks' in data:
@@ -197,8 +195,6 @@ def pull_tasks():
 def renew_lease(task_id):
     agent = g.current_agent
     data = validate_json_request(required_fields=['attempt_id', 'lease_id'])
-    if isinstance(data, tuple):
-        return data
 
     lease = AgentTaskLease.query.filter_by(
         task_id=task_id,
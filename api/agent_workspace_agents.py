@@ -159,8 +159,6 @@ def create_agent(workspace_id):
         required_fields=['name'],
         optional_fields=AGENT_EDITABLE_FIELDS + ['change_summary'],
     )
-    if isinstance(data, tuple):
-        return data
 
     name = str(data.get('name', '')).strip()
     if not name:
@@ -255,8 +253,6 @@ def update_agent(workspace_id, agent_id):
         return manage_err
 
     data = validate_json_request(optional_fields=AGENT_EDITABLE_FIELDS + ['status', 'change_summary'])
-    if isinstance(data, tuple):
-        return data
 
     updated_fields = []
     soul_changed = False
@@ -49,8 +49,6 @@ def create_agent_key(workspace_id, agent_id):
         return manage_err
 
     data = validate_json_request(required_fields=['name'])
-    if isinstance(data, tuple):
-        return data
 
     key, raw_token = AgentKey.generate_key(
         name=data['name'].strip(),
@@ -158,8 +156,6 @@ def create_connect_link(workspace_id, agent_id):
         return manage_err
 
     data = validate_json_request(optional_fields=['ttl_seconds'])
-    if isinstance(data, tuple):
-        return data
 
     ttl_seconds = int(data.get('ttl_seconds', 600)) if data else 600
     ttl_seconds = max(60, min(ttl_seconds, 3600))
@@ -237,8 +237,6 @@ def create_agent_secret_shares(workspace_id, agent_id, secret_id):
             'granted_reason',
         ],
     )
-    if isinstance(data, tuple):
-        return data
 
     target_agent_ids = []
     if data.get('target_agent_id') is not None:
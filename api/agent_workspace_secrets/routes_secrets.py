@@ -117,8 +117,6 @@ def create_agent_secret(workspace_id, agent_id):
         required_fields=['name', 'secret_value'],
         optional_fields=['secret_type', 'scope_type', 'project_id', 'description'],
     )
-    if isinstance(data, tuple):
-        return data
 
     name = str(data['name']).strip()
     secret_value = str(data['secret_value'])
@@ -318,8 +316,6 @@ def rotate_agent_secret(workspace_id, agent_id, secret_id):
         return err
 
     data = validate_json_request(required_fields=['secret_value'])
-    if isinstance(data, tuple):
-        return data
 
     if not secret.is_active:
         return ApiResponse.error('Secret is revoked', 400).to_response()
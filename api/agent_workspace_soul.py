@@ -89,8 +89,6 @@ def rollback_soul_version(workspace_id, agent_id):
         return manage_err
 
     data = validate_json_request(required_fields=['version'], optional_fields=['change_summary'])
-    if isinstance(data, tuple):
-        return data
 
     try:
         target_version = int(data['version'])
@@ -3,57 +3,116 @@ API Token管理接口
 """
 
 from flask import Blueprint, request, g
-from functools import wraps
 import secrets
 import hashlib
 from datetime import datetime, timedelta
+from sqlalchemy import delete, select
 
 from models import db, ApiToken, User
-from core.auth import unified_auth_required, get_current_user
+from core.auth import authenticate_request
+from core.api_token_cache import verify_api_token, invalidate_api_token_cache
+from core.redis_client import get_json as redis_get_json, set_json as redis_set_json
+from core.cache_invalidation import invalidate_api_token_list_cache
 from .base import ApiResponse
 
 api_tokens_bp = Blueprint('api_tokens', __name__)
+API_TOKENS_CACHE_TTL_SECONDS = 30
+api_tokens_fallback_cache = {}
 
+# 列表接口返回的列（与 ApiToken.to_dict(include_sensitive=False) 一致，不含 token_hash）
+_TOKEN_LIST_COLUMNS = (
+    ApiToken.id,
+    ApiToken.created_at,
+    ApiToken.updated_at,
+    ApiToken.created_by,
+    ApiToken.user_id,
+    ApiToken.name,
+    ApiToken.token_encrypted,
+    ApiToken.prefix,
+    ApiToken.description,
+    ApiToken.is_active,
+    ApiToken.expires_at,
+    ApiToken.last_used_at,
+    ApiToken.usage_count,
+)
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _token_row_to_dict(row):
+    return {
+        'id': row.id,
+        'created_at': _isoformat(row.created_at),
+        'updated_at': _isoformat(row.updated_at),
+        'created_by': row.created_by,
+        'user_id': row.user_id,
+        'name': row.name,
+        'token_encrypted': row.token_encrypted,
+        'prefix': row.prefix,
+        'description': row.description,
+        'is_active': row.is_active,
+        'expires_at': _isoformat(row.expires_at),
+        'last_used_at': _isoformat(row.last_used_at),
+        'usage_count': row.usage_count,
+    }
+
+
+def _api_tokens_cache_get(key):
+    redis_key = f"api-tokens:{key}"
+    cached = redis_get_json(redis_key)
+    if cached is not None:
+        return cached
+
+    item = api_tokens_fallback_cache.get(key)
+    if item and (datetime.utcnow().timestamp() - item['cached_at'] <= API_TOKENS_CACHE_TTL_SECONDS):
+        return item['value']
+    return None
+
+
+def _api_tokens_cache_set(key, value):
+    redis_key = f"api-tokens:{key}"
+    redis_set_json(redis_key, value, API_TOKENS_CACHE_TTL_SECONDS)
+    api_tokens_fallback_cache[key] = {
+        'cached_at': datetime.utcnow().timestamp(),
+        'value': value,
+    }
 
-def require_api_token_auth(f):
-    """API Token认证装饰器"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # 从请求头获取token
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return ApiResponse.error('Missing or invalid authorization header', 401).to_response()
-        
-        token = auth_header.split(' ')[1]
-        
-        # 验证token
-        api_token = ApiToken.verify_token(token)
-        if not api_token:
-            return ApiResponse.error('Invalid or expired token', 401).to_response()
-        
-        # 将token信息添加到g对象
-        g.api_token = api_token
-        g.current_user = api_token.user
-        
-        return f(*args, **kwargs)
-    
-    return decorated_function
+
+# 无需登录即可访问的端点（MCP 客户端用于校验 Token）
+_PUBLIC_ENDPOINTS = frozenset({'api_tokens.verify_token'})
+
+
+@api_tokens_bp.before_request
+def _auth_gate():
+    """蓝图级统一认证：每个请求只认证一次，视图函数直接读取 g.current_user"""
+    if request.method == 'OPTIONS' or request.endpoint in _PUBLIC_ENDPOINTS:
+        return None
+    if not authenticate_request():
+        return ApiResponse.unauthorized('Authentication required').to_response()
+    return None
 
 
 @api_tokens_bp.route('', methods=['GET'])
-@unified_auth_required
 def list_tokens():
     """获取当前用户的API Token列表"""
     try:
         user_id = g.current_user.id
-        
-        # 获取用户的所有token
-        tokens = ApiToken.query.filter_by(user_id=user_id).order_by(ApiToken.created_at.desc()).all()
-        
-        # 转换为字典格式（不包含敏感信息）
-        token_list = [token.to_dict(include_sensitive=False) for token in tokens]
-        
-        return ApiResponse.success({
+        cache_key = f"user:{user_id}:list"
+        cached = _api_tokens_cache_get(cache_key)
+        if cached is not None:
+            return ApiResponse.success(cached, "API tokens retrieved successfully").to_response()
+        
+        # 获取用户的所有token：只查询需要的列，直接由行元组构建字典，跳过ORM实例化（不包含敏感信息）
+        rows = db.session.execute(
+            select(*_TOKEN_LIST_COLUMNS)
+            .where(ApiToken.user_id == user_id)
+            .order_by(ApiToken.created_at.desc())
+        ).all()
+        token_list = [_token_row_to_dict(row) for row in rows]
+        
+        result = {
             'items': token_list,
             'pagination': {
                 'page': 1,
@@ -62,14 +121,15 @@ def list_tokens():
                 'has_prev': False,
                 'has_next': False
             }
-        }, "API tokens retrieved successfully").to_response()
+        }
+        _api_tokens_cache_set(cache_key, result)
+        return ApiResponse.success(result, "API tokens retrieved successfully").to_response()
 
     except Exception as e:
         return ApiResponse.error(f"Failed to retrieve API tokens: {str(e)}", 500).to_response()
 
 
 @api_tokens_bp.route('', methods=['POST'])
-@unified_auth_required
 def create_token():
     """创建新的API Token"""
     try:
@@ -107,6 +167,7 @@ def create_token():
         # 保存到数据库
         db.session.add(api_token)
         db.session.commit()
+        invalidate_api_token_list_cache(user_id)
         
         # 返回token信息（包含原始token，仅此一次）
         response_data = api_token.to_dict(include_sensitive=False)
@@ -123,7 +184,6 @@ def create_token():
 
 
 @api_tokens_bp.route('/<int:token_id>', methods=['PUT'])
-@unified_auth_required
 def update_token(token_id):
     """更新API Token"""
     try:
@@ -171,6 +231,8 @@ def update_token(token_id):
         
         # 保存更改
         db.session.commit()
+        invalidate_api_token_cache(api_token)
+        invalidate_api_token_list_cache(user_id)
         
         return ApiResponse.success(
             api_token.to_dict(include_sensitive=False),
@@ -183,7 +245,6 @@ def update_token(token_id):
 
 
 @api_tokens_bp.route('/<int:token_id>/reveal', methods=['GET'])
-@unified_auth_required
 def reveal_token(token_id):
     """获取解密的完整token"""
     try:
@@ -216,24 +277,22 @@ def reveal_token(token_id):
 
 
 @api_tokens_bp.route('/<int:token_id>', methods=['DELETE'])
-@unified_auth_required
 def delete_token(token_id):
     """删除API Token"""
     try:
         user_id = g.current_user.id
         
-        # 查找token
-        api_token = ApiToken.query.filter_by(
-            id=token_id,
-            user_id=user_id
-        ).first()
-        
-        if not api_token:
+        # 物理删除：单条 DELETE 语句，按影响行数区分 404
+        # 校验缓存命中时会按主键回表，已删除的 Token 自然失效，无需先查出 token_hash
+        result = db.session.execute(
+            delete(ApiToken).where(ApiToken.id == token_id, ApiToken.user_id == user_id)
+        )
+        if result.rowcount == 0:
+            db.session.rollback()
             return ApiResponse.error('Token not found', 404).to_response()
         
-        # 物理删除
-        db.session.delete(api_token)
         db.session.commit()
+        invalidate_api_token_list_cache(user_id)
         
         return ApiResponse.success(None, 'Token deleted successfully').to_response()
         
@@ -253,7 +312,7 @@ def verify_token():
         token = data.get('token')
         
         # 验证token
-        api_token = ApiToken.verify_token(token)
+        api_token = verify_api_token(token)
         if not api_token:
             return ApiResponse.error('Invalid or expired token', 401).to_response()
         
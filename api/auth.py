@@ -4,20 +4,44 @@
 提供用户认证相关的接口
 """
 
+import enum
 import os
+import re
 import secrets
 from datetime import datetime
-from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
+from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse, quote
 from flask import Blueprint, request, jsonify, redirect, url_for, session
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, select, update
 from models import db, User
-from .base import ApiResponse, paginate_query, validate_json_request, get_request_args, APIException, handle_api_error
+from models.base import ngram_match_filter
+from .base import ApiResponse, paginate_query, paginate_query_keyset, validate_json_request, get_request_args, APIException, handle_api_error
 from core.github_config import github_service, require_auth, get_current_user
 from core.google_config import google_service
+from core.rate_limit import rate_limit
 
 # 创建蓝图
 auth_bp = Blueprint('auth', __name__)
 
+# 运行环境在进程生命周期内不变，导入时读取一次
+_IS_DOCKER = os.environ.get('DOCKER_ENV') == 'true'
+_PRODUCTION_BASE_URL = 'https://todo4ai.org'
+_BACKEND_BASE_URL = _PRODUCTION_BASE_URL if _IS_DOCKER else 'http://localhost:50110'
+_GITHUB_DEFAULT_REDIRECT_URI = f'{_BACKEND_BASE_URL}/todo-for-ai/api/v1/auth/callback'
+_GOOGLE_DEFAULT_REDIRECT_URI = f'{_BACKEND_BASE_URL}/todo-for-ai/api/v1/auth/google/callback'
+_DEFAULT_DASHBOARD_URL = (
+    f'{_PRODUCTION_BASE_URL}/todo-for-ai/pages/dashboard'
+    if _IS_DOCKER else 'http://127.0.0.1:50111/todo-for-ai/pages/dashboard'
+)
+_GUEST_EMAIL = os.environ.get('GUEST_EMAIL', 'guest@todo4ai.local')
+# PUT /me 允许更新的字段
+_USER_UPDATABLE_FIELDS = ('nickname', 'full_name', 'bio', 'timezone', 'locale')
+# 指向后端服务（本地 50110 端口）的回跳地址前缀，统一替换为前端地址
+_BACKEND_ORIGIN_RE = re.compile(r'^http://(?:localhost|127\.0\.0\.1):50110')
+_BACKEND_API_PATH = '/todo-for-ai/api/v1'
+_FRONTEND_PAGES_PATH = '/todo-for-ai/pages'
+
+
 def _normalize_local_loopback_url(url: str) -> str:
     """在本地开发场景下统一回环地址，减少 localhost 解析抖动。"""
     if not url:
@@ -54,19 +78,48 @@ def _normalize_return_to(return_to: str, frontend_base: str) -> str:
         return f'{frontend_base}{return_to}'
 
     # 显式URL：仅当它指向后端地址时，替换到前端地址
-    if return_to.startswith('http://') or return_to.startswith('https://'):
+    if return_to.startswith(('http://', 'https://')):
         return_to = _normalize_local_loopback_url(return_to)
-        if 'localhost:50110' in return_to:
-            return return_to.replace('http://localhost:50110', frontend_base)
-        if '127.0.0.1:50110' in return_to:
-            return return_to.replace('http://127.0.0.1:50110', frontend_base)
-        if '/todo-for-ai/api/v1' in return_to:
-            return return_to.replace('/todo-for-ai/api/v1', '/todo-for-ai/pages')
-        return return_to
+        rewritten, count = _BACKEND_ORIGIN_RE.subn(frontend_base, return_to, count=1)
+        if count:
+            return rewritten
+        return return_to.replace(_BACKEND_API_PATH, _FRONTEND_PAGES_PATH)
 
     return f'{frontend_base}/todo-for-ai/pages/dashboard'
 
 
+# 用户列表返回的列（与 User.to_dict() 一致，不含 auth0_user_id/provider_user_id）
+_USER_LIST_COLUMNS = tuple(
+    column for column in User.__table__.columns
+    if column.name not in ('auth0_user_id', 'provider_user_id')
+)
+
+
+def _user_row_to_dict(row):
+    result = {}
+    for column in _USER_LIST_COLUMNS:
+        value = row._mapping[column]
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        result[column.name] = value
+    return result
+
+
+def _user_search_filter(search: str):
+    """用户搜索条件：MySQL 上优先使用 users 的 ngram 全文索引做子串匹配，其他情况回退到 LIKE"""
+    condition = ngram_match_filter((User.email, User.username, User.full_name), search)
+    if condition is not None:
+        return condition
+
+    return (
+        User.email.contains(search) |
+        User.username.contains(search) |
+        User.full_name.contains(search)
+    )
+
+
 def _append_query_params(url: str, params: dict) -> str:
     """Append params to URL while preserving existing query parameters."""
     parsed = urlparse(url)
@@ -76,6 +129,27 @@ def _append_query_params(url: str, params: dict) -> str:
     return urlunparse(parsed._replace(query=query))
 
 
+_TOKEN_REDIRECT_TEMPLATE = '{base}?access_token={access_token}&refresh_token={refresh_token}&token_type={token_type}'
+
+
+def _build_token_redirect_url(url: str, tokens: dict) -> str:
+    """拼接登录成功后携带令牌的回跳地址"""
+    # 常见情况：回跳地址不含查询串/锚点，直接套用模板，跳过 URL 解析与合并
+    if '?' not in url and '#' not in url:
+        return _TOKEN_REDIRECT_TEMPLATE.format(
+            base=url,
+            access_token=quote(tokens['access_token'], safe=''),
+            refresh_token=quote(tokens['refresh_token'], safe=''),
+            token_type=quote(tokens['token_type'], safe=''),
+        )
+
+    return _append_query_params(url, {
+        'access_token': tokens['access_token'],
+        'refresh_token': tokens['refresh_token'],
+        'token_type': tokens['token_type']
+    })
+
+
 @auth_bp.route('/login', methods=['GET'])
 def login():
     """启动GitHub登录流程（保持向后兼容）"""
@@ -86,18 +160,10 @@ def login():
 def github_login():
     """启动GitHub登录流程"""
     try:
-        # 获取重定向URL - 根据环境动态设置
-        is_docker = os.environ.get('DOCKER_ENV') == 'true'
-        if is_docker:
-            # 生产环境使用域名
-            default_redirect_uri = 'https://todo4ai.org/todo-for-ai/api/v1/auth/callback'
-            frontend_base = 'https://todo4ai.org'
-        else:
-            # 开发环境使用localhost
-            default_redirect_uri = 'http://localhost:50110/todo-for-ai/api/v1/auth/callback'
-            frontend_base = request.headers.get('Origin') or 'http://localhost:50111'
+        # 获取重定向URL - 生产环境使用域名，开发环境使用请求来源或localhost
+        frontend_base = _PRODUCTION_BASE_URL if _IS_DOCKER else (request.headers.get('Origin') or 'http://localhost:50111')
 
-        redirect_uri = request.args.get('redirect_uri', default_redirect_uri)
+        redirect_uri = request.args.get('redirect_uri', _GITHUB_DEFAULT_REDIRECT_URI)
 
         # 存储原始重定向URL，确保重定向到前端dashboard
         return_to = request.args.get('return_to', '/todo-for-ai/pages/dashboard')
@@ -118,18 +184,10 @@ def github_login():
 def google_login():
     """启动Google登录流程"""
     try:
-        # 获取重定向URL - 根据环境动态设置
-        is_docker = os.environ.get('DOCKER_ENV') == 'true'
-        if is_docker:
-            # 生产环境使用域名
-            default_redirect_uri = 'https://todo4ai.org/todo-for-ai/api/v1/auth/google/callback'
-            frontend_base = 'https://todo4ai.org'
-        else:
-            # 开发环境使用localhost
-            default_redirect_uri = 'http://localhost:50110/todo-for-ai/api/v1/auth/google/callback'
-            frontend_base = request.headers.get('Origin') or 'http://localhost:50111'
+        # 获取重定向URL - 生产环境使用域名，开发环境使用请求来源或localhost
+        frontend_base = _PRODUCTION_BASE_URL if _IS_DOCKER else (request.headers.get('Origin') or 'http://localhost:50111')
 
-        redirect_uri = request.args.get('redirect_uri', default_redirect_uri)
+        redirect_uri = request.args.get('redirect_uri', _GOOGLE_DEFAULT_REDIRECT_URI)
 
         # 存储原始重定向URL，确保重定向到前端dashboard
         return_to = request.args.get('return_to', '/todo-for-ai/pages/dashboard')
@@ -147,51 +205,47 @@ def google_login():
 
 
 @auth_bp.route('/login/guest', methods=['GET'])
+@rate_limit(10, 60)
 def guest_login():
     """游客模式登录：创建/复用本地游客账号并签发JWT"""
     try:
         # 根据环境确定前端地址
-        is_docker = os.environ.get('DOCKER_ENV') == 'true'
-        frontend_base = 'https://todo4ai.org' if is_docker else (request.headers.get('Origin') or 'http://127.0.0.1:50111')
+        frontend_base = _PRODUCTION_BASE_URL if _IS_DOCKER else (request.headers.get('Origin') or 'http://127.0.0.1:50111')
 
         # return_to 兼容相对路径与错误域名
         return_to = request.args.get('return_to', '/todo-for-ai/pages/dashboard')
         return_to = _normalize_return_to(return_to, frontend_base)
 
-        guest_email = os.environ.get('GUEST_EMAIL', 'guest@todo4ai.local')
-        user = User.query.filter_by(email=guest_email).first()
+        user = User.query.filter_by(email=_GUEST_EMAIL).first()
+
+        now = datetime.utcnow()
 
         # 首次登录时创建游客账户
         if not user:
             guest_id = f"guest-{secrets.token_hex(8)}"
             user = User(
-                email=guest_email,
+                email=_GUEST_EMAIL,
                 email_verified=False,
                 username='guest',
                 name='Guest User',
                 nickname='Guest',
                 provider='guest',
                 provider_user_id=guest_id,
-                last_login=datetime.utcnow(),
-                last_active_at=datetime.utcnow(),
+                last_login=now,
+                last_active_at=now,
             )
             db.session.add(user)
             db.session.commit()
         else:
-            user.last_login = datetime.utcnow()
-            user.last_active_at = datetime.utcnow()
+            user.last_login = now
+            user.last_active_at = now
             user.save()
 
         tokens = github_service.generate_tokens(user)
         if not tokens:
             return ApiResponse.error("Failed to generate guest tokens", 500).to_response()
 
-        params = {
-            'access_token': tokens['access_token'],
-            'refresh_token': tokens['refresh_token'],
-            'token_type': tokens['token_type']
-        }
-        return redirect(_append_query_params(return_to, params))
+        return redirect(_build_token_redirect_url(return_to, tokens))
 
     except Exception as e:
         return handle_api_error(e)
@@ -228,18 +282,11 @@ def github_callback():
         if not tokens:
             return ApiResponse.error("Failed to generate tokens", 500).to_response()
 
-        # 获取重定向URL，默认到dashboard - 根据环境动态设置
-        is_docker = os.environ.get('DOCKER_ENV') == 'true'
-        default_dashboard = 'https://todo4ai.org/todo-for-ai/pages/dashboard' if is_docker else 'http://127.0.0.1:50111/todo-for-ai/pages/dashboard'
-        redirect_url = session.pop('redirect_after_login', default_dashboard)
+        # 获取重定向URL，默认到dashboard
+        redirect_url = session.pop('redirect_after_login', _DEFAULT_DASHBOARD_URL)
 
         # 重定向到前端，并在URL中包含令牌（包括access_token和refresh_token）
-        params = {
-            'access_token': tokens['access_token'],
-            'refresh_token': tokens['refresh_token'],
-            'token_type': tokens['token_type']
-        }
-        return redirect(_append_query_params(redirect_url, params))
+        return redirect(_build_token_redirect_url(redirect_url, tokens))
 
     except Exception as e:
         return handle_api_error(e)
@@ -270,18 +317,11 @@ def google_callback():
         if not tokens:
             return ApiResponse.error("Failed to generate tokens", 500).to_response()
 
-        # 获取重定向URL，默认到dashboard - 根据环境动态设置
-        is_docker = os.environ.get('DOCKER_ENV') == 'true'
-        default_dashboard = 'https://todo4ai.org/todo-for-ai/pages/dashboard' if is_docker else 'http://127.0.0.1:50111/todo-for-ai/pages/dashboard'
-        redirect_url = session.pop('redirect_after_login', default_dashboard)
+        # 获取重定向URL，默认到dashboard
+        redirect_url = session.pop('redirect_after_login', _DEFAULT_DASHBOARD_URL)
 
         # 重定向到前端，并在URL中包含令牌（包括access_token和refresh_token）
-        params = {
-            'access_token': tokens['access_token'],
-            'refresh_token': tokens['refresh_token'],
-            'token_type': tokens['token_type']
-        }
-        return redirect(_append_query_params(redirect_url, params))
+        return redirect(_build_token_redirect_url(redirect_url, tokens))
 
     except Exception as e:
         return handle_api_error(e)
@@ -290,6 +330,7 @@ def google_callback():
 
 @auth_bp.route('/logout', methods=['POST'])
 @require_auth
+@rate_limit(30, 60)
 def logout():
     """用户登出"""
     try:
@@ -313,6 +354,7 @@ def logout():
 
 @auth_bp.route('/me', methods=['GET'])
 @require_auth
+@rate_limit(120, 60)
 def get_current_user_info():
     """获取当前用户信息"""
     try:
@@ -338,12 +380,7 @@ def update_current_user():
         
         data = request.get_json()
         
-        # 允许更新的字段
-        allowed_fields = ['nickname', 'full_name', 'bio', 'timezone', 'locale']
-        
-        for field in allowed_fields:
-            if field in data:
-                setattr(current_user, field, data[field])
+        changes = {field: data[field] for field in _USER_UPDATABLE_FIELDS if field in data}
         
         # 处理偏好设置
         if 'preferences' in data:
@@ -351,20 +388,34 @@ def update_current_user():
             if not isinstance(incoming_preferences, dict):
                 return ApiResponse.error("preferences must be an object", 400).to_response()
 
-            # JSON字段需要重新赋值，避免原地update导致ORM变更检测失效
+            # 在已加载的偏好上做浅合并，整体写回JSON列
             merged_preferences = dict(current_user.preferences or {})
             merged_preferences.update(incoming_preferences)
-            current_user.preferences = merged_preferences
-        
-        current_user.save()
+            changes['preferences'] = merged_preferences
+        
+        # 提交前由已加载的用户对象构建响应，避免提交后实例过期再回表查询
+        user_data = current_user.to_dict()
+        if changes:
+            changes['updated_at'] = datetime.utcnow()
+            db.session.execute(
+                update(User)
+                .where(User.id == current_user.id)
+                .values(**changes)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            user_data.update(changes)
+            user_data['updated_at'] = changes['updated_at'].isoformat()
         
-        return ApiResponse.success(current_user.to_dict(), "User information updated successfully").to_response()
+        return ApiResponse.success(user_data, "User information updated successfully").to_response()
         
     except Exception as e:
+        db.session.rollback()
         return handle_api_error(e)
 
 
 @auth_bp.route('/verify', methods=['POST'])
+@rate_limit(60, 60)
 def verify_token():
     """验证JWT令牌"""
     try:
@@ -417,6 +468,7 @@ def refresh():
 
 @auth_bp.route('/users', methods=['GET'])
 @require_auth
+@rate_limit(30, 60)
 def list_users():
     """获取用户列表（需要管理员权限）"""
     try:
@@ -432,38 +484,58 @@ def list_users():
         status = request.args.get('status')
         role = request.args.get('role')
         
-        # 构建查询
-        query = User.query
-        
+        if page < 1:
+            page = 1
+        if per_page < 1:
+            per_page = 20
+
+        # 只查询需要的列，直接由行元组构建字典，跳过ORM实例化与逐行 to_dict
+        conditions = []
         if search:
-            query = query.filter(
-                User.email.contains(search) |
-                User.username.contains(search) |
-                User.full_name.contains(search)
-            )
-        
+            conditions.append(_user_search_filter(search))
         if status:
-            query = query.filter_by(status=status)
-        
+            conditions.append(User.status == status)
         if role:
-            query = query.filter_by(role=role)
-        
-        # 分页
-        pagination = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
+            conditions.append(User.role == role)
+
+        # 传入 cursor 参数（首页为空串）时使用游标分页：按 created_at/id 倒序，无 COUNT/OFFSET
+        if 'cursor' in request.args:
+            try:
+                result = paginate_query_keyset(
+                    db.session.query(*_USER_LIST_COLUMNS).filter(*conditions),
+                    User.created_at,
+                    User.id,
+                    cursor=request.args.get('cursor'),
+                    per_page=per_page,
+                    serialize=_user_row_to_dict
+                )
+            except ValueError:
+                return ApiResponse.error("Invalid cursor", 400).to_response()
+            return ApiResponse.success({
+                'users': result['items'],
+                'pagination': result['pagination']
+            }, "Users retrieved successfully").to_response()
+
+        total = db.session.execute(
+            select(func.count(User.id)).where(*conditions)
+        ).scalar() or 0
+        rows = db.session.execute(
+            select(*_USER_LIST_COLUMNS)
+            .where(*conditions)
+            .limit(per_page)
+            .offset((page - 1) * per_page)
+        ).all() if total else []
+        pages = (total + per_page - 1) // per_page
+
         return ApiResponse.success({
-            'users': [user.to_dict() for user in pagination.items],
+            'users': [_user_row_to_dict(row) for row in rows],
             'pagination': {
-                'page': pagination.page,
-                'per_page': pagination.per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_prev': pagination.has_prev,
-                'has_next': pagination.has_next
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': pages,
+                'has_prev': page > 1,
+                'has_next': page < pages
             }
         }, "Users retrieved successfully").to_response()
         
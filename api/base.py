@@ -4,11 +4,25 @@ API 基础工具函数
 包含通用的响应格式、错误处理等工具函数
 """
 
+import base64
+import json
 from datetime import datetime
-from flask import jsonify, request
+from functools import lru_cache
+from flask import current_app, g, has_request_context, request
 from typing import Any, Optional, Dict
 
 
+def _request_timestamp() -> str:
+    """同一请求内生成的响应共用一个 ISO 时间戳"""
+    if not has_request_context():
+        return datetime.utcnow().isoformat()
+    timestamp = g.get('_response_timestamp')
+    if timestamp is None:
+        timestamp = datetime.utcnow().isoformat()
+        g._response_timestamp = timestamp
+    return timestamp
+
+
 class ApiResponse:
     """
     统一的API响应类
@@ -23,6 +37,9 @@ class ApiResponse:
     }
     """
 
+    # 固定字段使用 __slots__，额外字段（如 pagination、error_details）放在 extras 中
+    __slots__ = ('code', 'message', 'data', 'timestamp', 'path', 'extras')
+
     def __init__(self,
                  data: Any = None,
                  message: str = "Success",
@@ -33,12 +50,11 @@ class ApiResponse:
         self.code = code
         self.message = message
         self.data = data
-        self.timestamp = timestamp or datetime.utcnow().isoformat()
+        self.timestamp = timestamp or _request_timestamp()
         self.path = path or (request.path if request else None)
 
         # 支持额外的字段（如pagination等）
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        self.extras = kwargs
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -54,15 +70,24 @@ class ApiResponse:
             result['data'] = self.data
 
         # 添加其他额外字段
-        for key, value in self.__dict__.items():
-            if key not in ['code', 'message', 'data', 'timestamp', 'path']:
-                result[key] = value
+        if self.extras:
+            result.update(self.extras)
 
         return result
 
     def to_response(self):
         """转换为Flask响应对象"""
-        return jsonify(self.to_dict()), self.code
+        # 204 不允许携带响应体，跳过信封构建与序列化
+        if self.code == 204:
+            return current_app.response_class(status=204), 204
+
+        # 直接用应用的 orjson Provider 序列化为字节，跳过 jsonify 的参数处理
+        response = current_app.response_class(
+            current_app.json.dumps_bytes(self.to_dict()) + b"\n",
+            status=self.code,
+            mimetype='application/json'
+        )
+        return response, self.code
 
     @classmethod
     def success(cls, data: Any = None, message: str = "Success", code: int = 200, **kwargs):
@@ -95,10 +120,7 @@ class ApiResponse:
         return cls(data=None, message=message, code=401, **kwargs)
 
 
-
-
-
-def paginate_query(query, page=1, per_page=20, max_per_page=100):
+def paginate_query(query, page=1, per_page=20, max_per_page=100, serialize=None):
     """
     优化的分页查询工具函数 - 使用延迟加载提升性能
     
@@ -107,12 +129,11 @@ def paginate_query(query, page=1, per_page=20, max_per_page=100):
         page: 页码
         per_page: 每页数量
         max_per_page: 最大每页数量
+        serialize: 单条记录序列化函数，默认调用 to_dict()
     
     Returns:
         分页结果字典
     """
-    from sqlalchemy import func
-    
     # 限制每页数量
     per_page = min(per_page, max_per_page)
     offset = (page - 1) * per_page
@@ -131,8 +152,9 @@ def paginate_query(query, page=1, per_page=20, max_per_page=100):
     prev_num = page - 1 if has_prev else None
     next_num = page + 1 if has_next else None
     
+    serialize = serialize or (lambda item: item.to_dict())
     return {
-        'items': [item.to_dict() for item in items],
+        'items': [serialize(item) for item in items],
         'pagination': {
             'page': page,
             'per_page': per_page,
@@ -146,7 +168,7 @@ def paginate_query(query, page=1, per_page=20, max_per_page=100):
     }
 
 
-def paginate_query_fast(query, page=1, per_page=20, max_per_page=100):
+def paginate_query_fast(query, page=1, per_page=20, max_per_page=100, serialize=None):
     """
     高性能分页查询工具函数 - 不执行COUNT查询
     使用LIMIT+1的方式判断是否有下一页，避免慢速COUNT
@@ -158,6 +180,7 @@ def paginate_query_fast(query, page=1, per_page=20, max_per_page=100):
         page: 页码
         per_page: 每页数量
         max_per_page: 最大每页数量
+        serialize: 单条记录序列化函数，默认调用 to_dict()
     
     Returns:
         分页结果字典（不包含total和pages信息）
@@ -172,10 +195,11 @@ def paginate_query_fast(query, page=1, per_page=20, max_per_page=100):
     # 判断是否有下一页
     has_next = len(items) > per_page
     if has_next:
-        items = items[:per_page]  # 去掉多余的一条
+        del items[per_page:]  # 原地去掉多余的一条，不复制整页列表
     
+    serialize = serialize or (lambda item: item.to_dict())
     return {
-        'items': [item.to_dict() for item in items],
+        'items': [serialize(item) for item in items],
         'pagination': {
             'page': page,
             'per_page': per_page,
@@ -188,6 +212,108 @@ def paginate_query_fast(query, page=1, per_page=20, max_per_page=100):
     }
 
 
+def encode_keyset_cursor(*values):
+    """将排序键编码为不透明游标（datetime 按 ISO 格式保存）"""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    payload = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b'=').decode()
+
+
+def decode_keyset_cursor(cursor, size):
+    """
+    解析 encode_keyset_cursor 生成的游标
+
+    Returns:
+        长度为 size 的排序键列表（datetime 仍为 ISO 字符串，由调用方转换）
+
+    Raises:
+        ValueError: 游标格式非法
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _decode_keyset_cursor(cursor, sort_is_datetime):
+    """解析单列排序游标，格式非法时抛出 ValueError"""
+    sort_value, row_id = decode_keyset_cursor(cursor, 2)
+    try:
+        if sort_is_datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except Exception as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def paginate_query_keyset(query, sort_column, id_column, cursor=None, per_page=20, max_per_page=100, serialize=None):
+    """
+    游标（keyset）分页查询工具函数 - 按 (sort_column DESC, id_column DESC) 排序
+    以上一页最后一条记录的排序键定位下一页，不执行 COUNT，也不使用 OFFSET，
+    深分页同样只需一次索引定位
+
+    Args:
+        query: SQLAlchemy 查询对象（结果需包含 sort_column 与 id_column）
+        sort_column: 排序列
+        id_column: 主键列，用于同值排序键的稳定排序
+        cursor: 上一页返回的 next_cursor，为空时返回第一页
+        per_page: 每页数量
+        max_per_page: 最大每页数量
+        serialize: 单条记录序列化函数，默认调用 to_dict()
+
+    Returns:
+        分页结果字典（不包含total和pages信息）
+
+    Raises:
+        ValueError: 游标格式非法
+    """
+    from sqlalchemy import and_, or_
+
+    per_page = min(per_page, max_per_page)
+    serialize = serialize or (lambda item: item.to_dict())
+
+    if cursor:
+        sort_is_datetime = sort_column.type.python_type is datetime
+        last_sort_value, last_id = _decode_keyset_cursor(cursor, sort_is_datetime)
+        query = query.filter(or_(
+            sort_column < last_sort_value,
+            and_(sort_column == last_sort_value, id_column < last_id)
+        ))
+
+    # 获取per_page+1条数据，用于判断是否有下一页
+    items = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    has_next = len(items) > per_page
+    if has_next:
+        del items[per_page:]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_keyset_cursor(
+            getattr(last, sort_column.key),
+            getattr(last, id_column.key)
+        )
+
+    return {
+        'items': [serialize(item) for item in items],
+        'pagination': {
+            'per_page': per_page,
+            'has_next': has_next,
+            'next_cursor': next_cursor,
+        }
+    }
+
+
+@lru_cache(maxsize=256)
+def _allowed_field_set(required_fields, optional_fields):
+    """合并必需/可选字段为 frozenset（按调用点缓存）"""
+    return frozenset(required_fields) | frozenset(optional_fields)
+
+
 def validate_json_request(required_fields=None, optional_fields=None):
     """
     验证 JSON 请求数据
@@ -197,34 +323,34 @@ def validate_json_request(required_fields=None, optional_fields=None):
         optional_fields: 可选字段列表
     
     Returns:
-        验证后的数据字典或错误响应
+        验证后的数据字典
+
+    Raises:
+        APIException: 请求不是合法 JSON 或缺少必需字段（400），由应用错误处理器转换为错误响应
     """
     if not request.is_json:
-        return ApiResponse.error("Content-Type must be application/json", 400).to_response()
+        raise APIException("Content-Type must be application/json", 400)
 
     data = request.get_json()
     if not data:
-        return ApiResponse.error("Request body must contain valid JSON", 400).to_response()
+        raise APIException("Request body must contain valid JSON", 400)
     
     # 检查必需字段
     if required_fields:
         missing_fields = [field for field in required_fields if field not in data]
         if missing_fields:
-            return ApiResponse.error(
+            raise APIException(
                 f"Missing required fields: {', '.join(missing_fields)}",
                 400,
-                error_details={
-                    "code": "MISSING_FIELDS",
-                    "details": {"missing_fields": missing_fields}
-                }
-            ).to_response()
+                error_code="MISSING_FIELDS",
+                details={"missing_fields": missing_fields}
+            )
     
-    # 过滤允许的字段
-    allowed_fields = set()
-    if required_fields:
-        allowed_fields.update(required_fields)
-    if optional_fields:
-        allowed_fields.update(optional_fields)
+    # 过滤允许的字段（同一调用点的字段集合只构建一次）
+    allowed_fields = _allowed_field_set(
+        tuple(required_fields or ()),
+        tuple(optional_fields or ())
+    )
     
     if allowed_fields:
         filtered_data = {k: v for k, v in data.items() if k in allowed_fields}
@@ -253,6 +379,23 @@ def get_request_args():
     }
 
 
+# 查询参数布尔值：直接做集合查找，无需逐次 lower()
+_TRUTHY_ARG_VALUES = frozenset({'true', 'True', 'TRUE', '1', 'yes', 'on'})
+
+
+def get_bool_arg(name, default=None):
+    """
+    读取布尔型查询参数
+
+    Returns:
+        参数缺失时返回 default，否则按取值是否为真值字符串返回 True/False
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value in _TRUTHY_ARG_VALUES
+
+
 class APIException(Exception):
     """自定义 API 异常类"""
     
@@ -291,6 +434,10 @@ def handle_api_error(error, status_code=500):
     Returns:
         Flask Response 对象
     """
+    # 业务预期内的异常自带状态码与错误详情，直接返回
+    if isinstance(error, APIException):
+        return error.to_response()
+
     if isinstance(error, Exception):
         message = str(error)
     else:
@@ -5,17 +5,133 @@
 """
 
 from datetime import datetime
-from flask import Blueprint, request
-from models import db, ContextRule, Project
-from .base import ApiResponse, paginate_query, validate_json_request, get_request_args, APIException, handle_api_error
+from flask import Blueprint, current_app, g, request
+from sqlalchemy import and_, delete, update
+from sqlalchemy.orm import defer, selectinload
+from werkzeug.exceptions import HTTPException
+from models import db, ContextRule, Project, ProjectMember, ProjectMemberStatus
+from models.base import strict_loading_options
+from .base import ApiResponse, paginate_query, paginate_query_keyset, validate_json_request, get_request_args, get_bool_arg, APIException
 from core.auth import unified_auth_required, get_current_user
 from core.redis_client import get_json as redis_get_json, set_json as redis_set_json
-from core.cache_invalidation import invalidate_user_caches
+from core.cache_invalidation import invalidate_user_caches, invalidate_public_context_rules_cache
 
 # 创建蓝图
 context_rules_bp = Blueprint('context_rules', __name__)
 CONTEXT_RULES_CACHE_TTL_SECONDS = 20
 context_rules_fallback_cache = {}
+# 规则广场游标分页可用的排序字段（均按倒序）
+_PUBLIC_RULE_CURSOR_SORT_COLUMNS = {
+    'usage_count': ContextRule.usage_count,
+    'created_at': ContextRule.created_at,
+    'updated_at': ContextRule.updated_at,
+}
+# 列表接口 include_content=false 时排除的列
+_LIST_EXCLUDED_CONTENT = ('content',)
+# 列表接口允许的排序字段（白名单）
+_RULE_SORT_COLUMNS = {
+    'name': ContextRule.name,
+    'priority': ContextRule.priority,
+    'created_at': ContextRule.created_at,
+    'updated_at': ContextRule.updated_at,
+}
+
+
+def _rule_with_project_options():
+    """输出 to_dict(include_project=True) 的查询预加载项目，其余关系按严格加载处理"""
+    return (selectinload(ContextRule.project), *strict_loading_options())
+
+
+def _fetch_project_access(user, project_id):
+    """
+    返回 (project, allowed)：project 只含 (id, owner_id)，不实例化完整 Project，项目不存在时为 None；
+    左连接当前用户的有效成员记录，一次查询得到项目与权限，同一请求内按项目ID复用结果（含不存在的项目）
+    """
+    cache = g.setdefault('_project_access_cache', {})
+    key = (user.id, project_id)
+    if key not in cache:
+        row = db.session.query(Project.id, Project.owner_id, ProjectMember.id.label('member_id')).outerjoin(
+            ProjectMember,
+            and_(
+                ProjectMember.project_id == Project.id,
+                ProjectMember.user_id == user.id,
+                ProjectMember.status == ProjectMemberStatus.ACTIVE,
+            )
+        ).filter(Project.id == project_id).first()
+        if row is None:
+            cache[key] = (None, False)
+        else:
+            cache[key] = (row, row.owner_id == user.id or row.member_id is not None)
+    return cache[key]
+
+
+def _set_context_rule_active(context_rule, is_active):
+    """
+    切换规则启用状态并返回响应数据：状态未变化时不写库；
+    否则执行单条 UPDATE，并在提交前由已加载的实例构建响应，避免提交后过期回表
+    """
+    rule_data = context_rule.to_dict()
+    if context_rule.is_active == is_active:
+        return rule_data
+
+    now = datetime.utcnow()
+    db.session.execute(
+        update(ContextRule)
+        .where(ContextRule.id == context_rule.id)
+        .values(is_active=is_active, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    # 提交后实例已过期，改从响应数据读取，避免再次回表
+    invalidate_user_caches(rule_data['user_id'])
+    if rule_data['is_public']:
+        invalidate_public_context_rules_cache()
+
+    rule_data['is_active'] = is_active
+    rule_data['updated_at'] = now.isoformat()
+    return rule_data
+
+
+# 各端点未预期异常的错误信息前缀
+_ENDPOINT_ERROR_MESSAGES = {
+    'list_context_rules': 'Failed to retrieve context rules',
+    'create_context_rule': 'Failed to create context rule',
+    'get_context_rule': 'Failed to retrieve context rule',
+    'update_context_rule': 'Failed to update context rule',
+    'delete_context_rule': 'Failed to delete context rule',
+    'activate_context_rule': 'Failed to activate context rule',
+    'deactivate_context_rule': 'Failed to deactivate context rule',
+    'build_context': 'Failed to build context',
+    'get_public_rules': 'Failed to retrieve public rules',
+    'copy_rule_from_marketplace': 'Failed to copy rule',
+    'get_global_context_rules': 'Failed to retrieve global context rules',
+    'get_merged_context_rules': 'Failed to retrieve merged context rules',
+    'preview_merged_rules': 'Failed to generate context rules preview',
+}
+
+
+@context_rules_bp.errorhandler(APIException)
+def _handle_api_exception(error):
+    """业务异常：回滚未提交的写入，按异常自带的状态码返回"""
+    db.session.rollback()
+    return error.to_response()
+
+
+@context_rules_bp.errorhandler(Exception)
+def _handle_unexpected_exception(error):
+    """
+    蓝图内统一的异常出口，视图函数只保留正常路径
+
+    应用级已注册的 HTTP 状态码（400/404 等）会先匹配应用的处理器，不会进入这里
+    """
+    if isinstance(error, HTTPException):
+        return ApiResponse.error(error.description, error.code).to_response()
+
+    db.session.rollback()
+    current_app.logger.exception(f"Unhandled error in {request.endpoint}")
+    endpoint = (request.endpoint or '').rpartition('.')[2]
+    prefix = _ENDPOINT_ERROR_MESSAGES.get(endpoint, 'Context rule request failed')
+    return ApiResponse.error(f"{prefix}: {str(error)}", 500).to_response()
 
 
 def _context_rules_cache_get(key):
@@ -43,327 +159,295 @@ def _context_rules_cache_set(key, value):
 @unified_auth_required
 def list_context_rules():
     """获取上下文规则列表"""
-    try:
-        current_user = get_current_user()
-        args = get_request_args()
-
-        # 构建查询 - 只返回当前用户的规则
-        query = ContextRule.query.filter_by(user_id=current_user.id)
-
-        # 项目筛选
-        if args['project_id']:
-            project_id = args['project_id']
-            # 验证用户是否有权限访问该项目
-            project = Project.query.get(project_id)
-            if project and not current_user.can_access_project(project):
-                return ApiResponse.error("Access denied to project", 403, error_details={"code": "PROJECT_ACCESS_DENIED"}).to_response()
-            query = query.filter_by(project_id=project_id)
-        elif request.args.get('scope') == 'global':
-            query = query.filter_by(project_id=None)
-        
-
-        
-        # 激活状态筛选
-        is_active = request.args.get('is_active')
-        if is_active is not None:
-            query = query.filter_by(is_active=is_active.lower() == 'true')
-        
-        # 应用范围筛选
-        apply_to_tasks = request.args.get('apply_to_tasks')
-        if apply_to_tasks is not None:
-            query = query.filter_by(apply_to_tasks=apply_to_tasks.lower() == 'true')
-        
-        apply_to_projects = request.args.get('apply_to_projects')
-        if apply_to_projects is not None:
-            query = query.filter_by(apply_to_projects=apply_to_projects.lower() == 'true')
-        
-        # 搜索
-        if args['search']:
-            search_term = f"%{args['search']}%"
-            query = query.filter(
-                ContextRule.name.like(search_term) |
-                ContextRule.description.like(search_term) |
-                ContextRule.content.like(search_term)
-            )
-        
-        # 排序
-        if args['sort_by'] == 'name':
-            order_column = ContextRule.name
-        elif args['sort_by'] == 'priority':
-            order_column = ContextRule.priority
-        elif args['sort_by'] == 'rule_type':
-            order_column = ContextRule.rule_type
-        elif args['sort_by'] == 'updated_at':
-            order_column = ContextRule.updated_at
-        else:
-            order_column = ContextRule.created_at
-        
-        if args['sort_order'] == 'desc':
-            query = query.order_by(order_column.desc())
-        else:
-            query = query.order_by(order_column.asc())
-        
-        # 分页
-        result = paginate_query(query, args['page'], args['per_page'])
-
-        # 批量加载项目信息，避免 N+1 查询
-        project_ids = list({item['project_id'] for item in result['items'] if item.get('project_id')})
-        project_map = {}
-        if project_ids:
-            projects = db.session.query(Project.id, Project.name, Project.color).filter(
-                Project.id.in_(project_ids)
-            ).all()
-            project_map = {
-                project.id: {
-                    'id': project.id,
-                    'name': project.name,
-                    'color': project.color
-                }
-                for project in projects
+    current_user = get_current_user()
+    args = get_request_args()
+
+    # 构建查询 - 只返回当前用户的规则
+    query = ContextRule.query.options(*strict_loading_options()).filter_by(user_id=current_user.id)
+
+    # 项目筛选
+    if args['project_id']:
+        project_id = args['project_id']
+        # 验证用户是否有权限访问该项目
+        project, allowed = _fetch_project_access(current_user, project_id)
+        if project and not allowed:
+            return ApiResponse.error("Access denied to project", 403, error_details={"code": "PROJECT_ACCESS_DENIED"}).to_response()
+        query = query.filter_by(project_id=project_id)
+    elif request.args.get('scope') == 'global':
+        query = query.filter_by(project_id=None)
+
+
+    # 激活状态与应用范围筛选（未传的参数不参与筛选）
+    flag_filters = {}
+    for field in ('is_active', 'apply_to_tasks', 'apply_to_projects'):
+        value = get_bool_arg(field)
+        if value is not None:
+            flag_filters[field] = value
+    if flag_filters:
+        query = query.filter_by(**flag_filters)
+
+    # 搜索
+    if args['search']:
+        query = query.filter(ContextRule.search_filter(args['search']))
+    
+    # 排序
+    order_column = _RULE_SORT_COLUMNS.get(args['sort_by'], ContextRule.created_at)
+    if args['sort_order'] == 'desc':
+        query = query.order_by(order_column.desc())
+    else:
+        query = query.order_by(order_column.asc())
+    
+    # include_content=false 时不查询、不返回规则正文（TEXT 列，列表页通常只需名称与开关状态）
+    serialize = None
+    if not get_bool_arg('include_content', True):
+        query = query.options(defer(ContextRule.content))
+        serialize = lambda rule: rule.to_dict(exclude=_LIST_EXCLUDED_CONTENT)
+
+    # 分页
+    result = paginate_query(query, args['page'], args['per_page'], serialize=serialize)
+
+    # 批量加载项目信息，避免 N+1 查询
+    project_ids = list({item['project_id'] for item in result['items'] if item.get('project_id')})
+    project_map = {}
+    if project_ids:
+        projects = db.session.query(Project.id, Project.name, Project.color).filter(
+            Project.id.in_(project_ids)
+        ).all()
+        project_map = {
+            project.id: {
+                'id': project.id,
+                'name': project.name,
+                'color': project.color
             }
+            for project in projects
+        }
 
-        for item in result['items']:
-            project_id = item.get('project_id')
-            if project_id and project_id in project_map:
-                item['project'] = project_map[project_id]
-        
-        return ApiResponse.success(result, "Context rules retrieved successfully").to_response()
-        
-    except Exception as e:
-        return ApiResponse.error(f"Failed to retrieve context rules: {str(e)}", 500).to_response()
+    for item in result['items']:
+        project_id = item.get('project_id')
+        if project_id and project_id in project_map:
+            item['project'] = project_map[project_id]
+    
+    return ApiResponse.success(result, "Context rules retrieved successfully").to_response()
 
 
 @context_rules_bp.route('', methods=['POST'])
 @unified_auth_required
 def create_context_rule():
     """创建新的上下文规则"""
-    try:
-        current_user = get_current_user()
-
-        # 验证请求数据
-        data = validate_json_request(
-            required_fields=['name', 'content'],
-            optional_fields=[
-                'project_id', 'description', 'priority',
-                'is_active', 'apply_to_tasks', 'apply_to_projects',
-                'is_public'
-            ]
-        )
-
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
-        # 验证项目是否存在（如果指定了项目ID）
-        if data.get('project_id'):
-            project = Project.query.get(data['project_id'])
-            if not project:
-                return ApiResponse.error("Project not found", 404, error_details={"code": "PROJECT_NOT_FOUND"}).to_response()
-
-            # 检查用户是否有权限访问该项目
-            if not current_user.can_access_project(project):
-                return ApiResponse.error("Access denied to project", 403, error_details={"code": "PROJECT_ACCESS_DENIED"}).to_response()
-
-        # 创建上下文规则
-        context_rule = ContextRule.create(
-            user_id=current_user.id,
-            project_id=data.get('project_id'),
-            name=data['name'],
-            description=data.get('description', ''),
-            content=data['content'],
-            priority=data.get('priority', 0),
-            is_active=data.get('is_active', True),
-            apply_to_tasks=data.get('apply_to_tasks', True),
-            apply_to_projects=data.get('apply_to_projects', False),
-            is_public=data.get('is_public', False),
-            usage_count=0,
-            created_by='api'
-        )
-
-        db.session.commit()
-        invalidate_user_caches(current_user.id)
-
-        return ApiResponse.created(
-            context_rule.to_dict(include_project=True),
-            "Context rule created successfully"
-        ).to_response()
-
-    except Exception as e:
-        db.session.rollback()
-        return ApiResponse.error(f"Failed to create context rule: {str(e)}", 500).to_response()
+    current_user = get_current_user()
+
+    # 验证请求数据
+    data = validate_json_request(
+        required_fields=['name', 'content'],
+        optional_fields=[
+            'project_id', 'description', 'priority',
+            'is_active', 'apply_to_tasks', 'apply_to_projects',
+            'is_public'
+        ]
+    )
+
+    # 验证项目是否存在（如果指定了项目ID）
+    if data.get('project_id'):
+        project, allowed = _fetch_project_access(current_user, data['project_id'])
+        if not project:
+            return ApiResponse.error("Project not found", 404, error_details={"code": "PROJECT_NOT_FOUND"}).to_response()
+
+        # 检查用户是否有权限访问该项目
+        if not allowed:
+            return ApiResponse.error("Access denied to project", 403, error_details={"code": "PROJECT_ACCESS_DENIED"}).to_response()
+
+    # 创建上下文规则
+    context_rule = ContextRule.create(
+        user_id=current_user.id,
+        project_id=data.get('project_id'),
+        name=data['name'],
+        description=data.get('description', ''),
+        content=data['content'],
+        priority=data.get('priority', 0),
+        is_active=data.get('is_active', True),
+        apply_to_tasks=data.get('apply_to_tasks', True),
+        apply_to_projects=data.get('apply_to_projects', False),
+        is_public=data.get('is_public', False),
+        usage_count=0,
+        created_by='api'
+    )
+
+    db.session.commit()
+    invalidate_user_caches(current_user.id)
+    if context_rule.is_public:
+        invalidate_public_context_rules_cache()
+
+    return ApiResponse.created(
+        context_rule.to_dict(include_project=True),
+        "Context rule created successfully"
+    ).to_response()
 
 
 @context_rules_bp.route('/<int:rule_id>', methods=['GET'])
 @unified_auth_required
 def get_context_rule(rule_id):
     """获取单个上下文规则详情"""
-    try:
-        current_user = get_current_user()
-        context_rule = ContextRule.query.filter_by(id=rule_id, user_id=current_user.id).first()
-        if not context_rule:
-            return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
-
-        return ApiResponse.success(
-            context_rule.to_dict(include_project=True),
-            "Context rule retrieved successfully"
-        ).to_response()
+    current_user = get_current_user()
+    context_rule = ContextRule.query.options(*_rule_with_project_options()).filter_by(
+        id=rule_id, user_id=current_user.id
+    ).first()
+    if not context_rule:
+        return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
 
-    except Exception as e:
-        return ApiResponse.error(f"Failed to retrieve context rule: {str(e)}", 500).to_response()
+    return ApiResponse.success(
+        context_rule.to_dict(include_project=True),
+        "Context rule retrieved successfully"
+    ).to_response()
 
 
 @context_rules_bp.route('/<int:rule_id>', methods=['PUT'])
 @unified_auth_required
 def update_context_rule(rule_id):
     """更新上下文规则"""
-    try:
-        current_user = get_current_user()
-        context_rule = ContextRule.query.filter_by(id=rule_id, user_id=current_user.id).first()
-        if not context_rule:
-            return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
-
-        # 验证请求数据
-        data = validate_json_request(
-            optional_fields=[
-                'name', 'description', 'content', 'priority',
-                'is_active', 'apply_to_tasks', 'apply_to_projects', 'is_public'
-            ]
-        )
-
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
-        # 更新其他字段
-        simple_fields = ['name', 'description', 'content', 'priority', 'is_active', 'apply_to_tasks', 'apply_to_projects', 'is_public']
-        for field in simple_fields:
-            if field in data:
-                setattr(context_rule, field, data[field])
-
-        db.session.commit()
-        invalidate_user_caches(current_user.id)
-
+    current_user = get_current_user()
+    context_rule = ContextRule.query.options(*_rule_with_project_options()).filter_by(
+        id=rule_id, user_id=current_user.id
+    ).first()
+    if not context_rule:
+        return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
+
+    # 验证请求数据
+    data = validate_json_request(
+        optional_fields=[
+            'name', 'description', 'content', 'priority',
+            'is_active', 'apply_to_tasks', 'apply_to_projects', 'is_public'
+        ]
+    )
+
+    # 公开前后任一状态为公开时，规则广场缓存需要失效
+    was_public = context_rule.is_public
+
+    # 更新其他字段，只写入值确有变化的字段
+    simple_fields = ['name', 'description', 'content', 'priority', 'is_active', 'apply_to_tasks', 'apply_to_projects', 'is_public']
+    changed = False
+    for field in simple_fields:
+        if field in data and getattr(context_rule, field) != data[field]:
+            setattr(context_rule, field, data[field])
+            changed = True
+
+    # 没有实际变化时不写库，也不失效缓存
+    if not changed:
         return ApiResponse.success(
             context_rule.to_dict(include_project=True),
             "Context rule updated successfully"
         ).to_response()
 
-    except Exception as e:
-        db.session.rollback()
-        return ApiResponse.error(f"Failed to update context rule: {str(e)}", 500).to_response()
+    affects_marketplace = was_public or context_rule.is_public
+    # flush 后即由已加载的实例（含 updated_at）构建响应，避免提交后过期回表重新加载规则与项目
+    db.session.flush()
+    rule_data = context_rule.to_dict(include_project=True)
+    db.session.commit()
+    invalidate_user_caches(rule_data['user_id'])
+    if affects_marketplace:
+        invalidate_public_context_rules_cache()
+
+    return ApiResponse.success(
+        rule_data,
+        "Context rule updated successfully"
+    ).to_response()
 
 
 @context_rules_bp.route('/<int:rule_id>', methods=['DELETE'])
 @unified_auth_required
 def delete_context_rule(rule_id):
     """删除上下文规则"""
-    try:
-        current_user = get_current_user()
-        context_rule = ContextRule.query.filter_by(id=rule_id, user_id=current_user.id).first()
-        if not context_rule:
-            return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
+    current_user = get_current_user()
 
-        # 删除规则
-        context_rule.delete()
-        invalidate_user_caches(current_user.id)
+    # 单条 DELETE 语句完成归属校验与删除，按影响行数区分 404（规则没有需要级联处理的子记录）
+    result = db.session.execute(
+        delete(ContextRule).where(ContextRule.id == rule_id, ContextRule.user_id == current_user.id)
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
 
-        return ApiResponse.success(None, "Context rule deleted successfully", 204).to_response()
+    db.session.commit()
+    invalidate_user_caches(current_user.id)
+    # 删除前未读取规则，无法判断是否公开，统一失效规则广场缓存
+    invalidate_public_context_rules_cache()
 
-    except Exception as e:
-        db.session.rollback()
-        return ApiResponse.error(f"Failed to delete context rule: {str(e)}", 500).to_response()
+    return ApiResponse.success(None, "Context rule deleted successfully", 204).to_response()
 
 
 @context_rules_bp.route('/<int:rule_id>/activate', methods=['POST'])
 @unified_auth_required
 def activate_context_rule(rule_id):
     """激活上下文规则"""
-    try:
-        current_user = get_current_user()
-        context_rule = ContextRule.query.filter_by(id=rule_id, user_id=current_user.id).first()
-        if not context_rule:
-            return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
+    current_user = get_current_user()
+    context_rule = ContextRule.query.filter_by(id=rule_id, user_id=current_user.id).first()
+    if not context_rule:
+        return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
 
-        context_rule.activate()
-        invalidate_user_caches(current_user.id)
-
-        return ApiResponse.success(
-            context_rule.to_dict(),
-            "Context rule activated successfully"
-        ).to_response()
+    rule_data = _set_context_rule_active(context_rule, True)
 
-    except Exception as e:
-        db.session.rollback()
-        return ApiResponse.error(f"Failed to activate context rule: {str(e)}", 500).to_response()
+    return ApiResponse.success(
+        rule_data,
+        "Context rule activated successfully"
+    ).to_response()
 
 
 @context_rules_bp.route('/<int:rule_id>/deactivate', methods=['POST'])
 @unified_auth_required
 def deactivate_context_rule(rule_id):
     """停用上下文规则"""
-    try:
-        current_user = get_current_user()
-        context_rule = ContextRule.query.filter_by(id=rule_id, user_id=current_user.id).first()
-        if not context_rule:
-            return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
+    current_user = get_current_user()
+    context_rule = ContextRule.query.filter_by(id=rule_id, user_id=current_user.id).first()
+    if not context_rule:
+        return ApiResponse.error("Context rule not found", 404, error_details={"code": "CONTEXT_RULE_NOT_FOUND"}).to_response()
 
-        context_rule.deactivate()
-        invalidate_user_caches(current_user.id)
+    rule_data = _set_context_rule_active(context_rule, False)
 
-        return ApiResponse.success(
-            context_rule.to_dict(),
-            "Context rule deactivated successfully"
-        ).to_response()
-
-    except Exception as e:
-        db.session.rollback()
-        return ApiResponse.error(f"Failed to deactivate context rule: {str(e)}", 500).to_response()
+    return ApiResponse.success(
+        rule_data,
+        "Context rule deactivated successfully"
+    ).to_response()
 
 
 @context_rules_bp.route('/build-context', methods=['POST'])
 @unified_auth_required
 def build_context():
     """构建上下文字符串"""
-    try:
-        current_user = get_current_user()
-
-        # 验证请求数据
-        data = validate_json_request(
-            optional_fields=['project_id', 'for_tasks', 'for_projects']
-        )
-
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
-        project_id = data.get('project_id')
-        for_tasks = data.get('for_tasks', True)
-        for_projects = data.get('for_projects', False)
-
-        # 构建上下文字符串（只包含当前用户的规则）
-        context_string = ContextRule.build_context_string(
-            project_id=project_id,
-            user_id=current_user.id,
-            for_tasks=for_tasks,
-            for_projects=for_projects
-        )
-
-        # 获取应用的规则列表
+    current_user = get_current_user()
+
+    # 验证请求数据
+    data = validate_json_request(
+        optional_fields=['project_id', 'for_tasks', 'for_projects']
+    )
+
+    # 规范化输入：语义相同的请求（如 "5" 与 5、1 与 true）落到同一缓存键
+    project_id = data.get('project_id')
+    if project_id is not None:
+        try:
+            project_id = int(project_id)
+        except (TypeError, ValueError):
+            return ApiResponse.error("Invalid project_id", 400).to_response()
+    for_tasks = bool(data.get('for_tasks', True))
+    for_projects = bool(data.get('for_projects', False))
+
+    # 规则变更时 invalidate_user_caches 会清理 context-rules:user:{id}:* 下的缓存
+    cache_key = f"user:{current_user.id}:build:{project_id}:{int(for_tasks)}:{int(for_projects)}"
+    result = _context_rules_cache_get(cache_key)
+    if result is None:
+        # 获取应用的规则列表（只包含当前用户的规则），上下文字符串由同一批规则拼接
         applicable_rules = ContextRule.get_applicable_rules(
             project_id=project_id,
             user_id=current_user.id,
             for_tasks=for_tasks,
             for_projects=for_projects
         )
-        
-        return ApiResponse.success(
-            {
-                'context_string': context_string,
-                'rules_applied': len(applicable_rules),
-                'rules': [rule.to_dict() for rule in applicable_rules]
-            },
-            "Context built successfully"
-        ).to_response()
+        result = {
+            'context_string': ContextRule.format_context_string(applicable_rules),
+            'rules_applied': len(applicable_rules),
+            'rules': [rule.to_dict() for rule in applicable_rules]
+        }
+        _context_rules_cache_set(cache_key, result)
 
-    except Exception as e:
-        return ApiResponse.error(f"Failed to build context: {str(e)}", 500).to_response()
+    return ApiResponse.success(result, "Context built successfully").to_response()
 
 
 # 规则广场相关API
@@ -371,251 +455,211 @@ def build_context():
 @unified_auth_required
 def get_public_rules():
     """获取规则广场的公开规则"""
-    try:
-        args = get_request_args()
-
-        # 获取公开规则
-        pagination = ContextRule.get_public_rules(
-            search=args.get('search'),
-            sort_by=args.get('sort_by', 'usage_count'),
-            sort_order=args.get('sort_order', 'desc'),
-            page=args.get('page', 1),
-            per_page=min(args.get('per_page', 20), 100)
-        )
-
-        # 转换为字典，包含用户信息
-        rules = [rule.to_dict(include_project=True, include_user=True) for rule in pagination.items]
-
-        return ApiResponse.success({
-            'items': rules,
-            'pagination': {
-                'page': pagination.page,
-                'per_page': pagination.per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_prev': pagination.has_prev,
-                'has_next': pagination.has_next
-            }
-        }, "Public rules retrieved successfully").to_response()
+    args = get_request_args()
+    search = args.get('search')
+    sort_by = args.get('sort_by', 'usage_count')
+    sort_order = args.get('sort_order', 'desc')
+    page = args.get('page', 1)
+    per_page = min(args.get('per_page', 20), 100)
+
+    # 传入 cursor 参数（首页为空串）时使用游标分页：按 (排序列, id) 倒序，无 COUNT/OFFSET
+    if 'cursor' in request.args:
+        cursor = request.args.get('cursor')
+        sort_column = _PUBLIC_RULE_CURSOR_SORT_COLUMNS.get(sort_by, ContextRule.usage_count)
+        cache_key = f"public:cursor:{sort_column.key}:{per_page}:{cursor}:{search}"
+        cached = _context_rules_cache_get(cache_key)
+        if cached is not None:
+            return ApiResponse.success(cached, "Public rules retrieved successfully").to_response()
+        try:
+            result = paginate_query_keyset(
+                ContextRule.public_rules_query(search),
+                sort_column,
+                ContextRule.id,
+                cursor=cursor,
+                per_page=per_page,
+                serialize=ContextRule.public_row_to_dict
+            )
+        except ValueError:
+            return ApiResponse.error("Invalid cursor", 400).to_response()
+        _context_rules_cache_set(cache_key, result)
+        return ApiResponse.success(result, "Public rules retrieved successfully").to_response()
 
-    except Exception as e:
-        return ApiResponse.error(f"Failed to retrieve public rules: {str(e)}", 500).to_response()
+    # 公开规则与当前用户无关，所有用户共用同一份缓存
+    cache_key = f"public:{sort_by}:{sort_order}:{page}:{per_page}:{search}"
+    cached = _context_rules_cache_get(cache_key)
+    if cached is not None:
+        return ApiResponse.success(cached, "Public rules retrieved successfully").to_response()
+
+    # 获取公开规则
+    pagination = ContextRule.get_public_rules(
+        search=search,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        page=page,
+        per_page=per_page
+    )
+
+    # 转换为字典，包含项目与用户信息
+    rules = [ContextRule.public_row_to_dict(row) for row in pagination.items]
+
+    result = {
+        'items': rules,
+        'pagination': {
+            'page': pagination.page,
+            'per_page': pagination.per_page,
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'has_prev': pagination.has_prev,
+            'has_next': pagination.has_next
+        }
+    }
+    _context_rules_cache_set(cache_key, result)
+    return ApiResponse.success(result, "Public rules retrieved successfully").to_response()
 
 
 @context_rules_bp.route('/<int:rule_id>/copy', methods=['POST'])
 @unified_auth_required
 def copy_rule_from_marketplace(rule_id):
     """从规则广场复制规则"""
-    try:
-        current_user = get_current_user()
-
-        # 获取要复制的规则（必须是公开的）
-        source_rule = ContextRule.query.filter_by(id=rule_id, is_public=True, is_active=True).first()
-        if not source_rule:
-            return ApiResponse.error("Public rule not found", 404, error_details={"code": "RULE_NOT_FOUND"}).to_response()
-
-        # 验证请求数据
-        data = validate_json_request(
-            optional_fields=['name', 'target_project_id', 'copy_as_global']
-        )
-
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
-        # 确定复制的名称
-        new_name = data.get('name', f"{source_rule.name} - 副本")
-
-        # 确定目标项目ID
-        target_project_id = None
-        copy_as_global = data.get('copy_as_global', True)
-
-        if not copy_as_global and data.get('target_project_id'):
-            target_project_id = data['target_project_id']
-            # 验证用户是否有权限访问目标项目
-            project = Project.query.get(target_project_id)
-            if not project or not current_user.can_access_project(project):
-                return ApiResponse.error("Access denied to target project", 403, error_details={"code": "PROJECT_ACCESS_DENIED"}).to_response()
-
-        # 复制规则
-        new_rule = source_rule.copy_to_user(
-            target_user_id=current_user.id,
-            new_name=new_name,
-            target_project_id=target_project_id
-        )
-
-        return ApiResponse.created(
-            new_rule.to_dict(include_project=True),
-            "Rule copied successfully"
-        ).to_response()
-
-    except Exception as e:
-        db.session.rollback()
-        return ApiResponse.error(f"Failed to copy rule: {str(e)}", 500).to_response()
+    current_user = get_current_user()
+
+    # 获取要复制的规则（必须是公开的）
+    source_rule = ContextRule.query.filter_by(id=rule_id, is_public=True, is_active=True).first()
+    if not source_rule:
+        return ApiResponse.error("Public rule not found", 404, error_details={"code": "RULE_NOT_FOUND"}).to_response()
+
+    # 验证请求数据
+    data = validate_json_request(
+        optional_fields=['name', 'target_project_id', 'copy_as_global']
+    )
+
+    # 确定复制的名称
+    new_name = data.get('name', f"{source_rule.name} - 副本")
+
+    # 确定目标项目ID
+    target_project_id = None
+    copy_as_global = data.get('copy_as_global', True)
+
+    if not copy_as_global and data.get('target_project_id'):
+        target_project_id = data['target_project_id']
+        # 验证用户是否有权限访问目标项目
+        _, allowed = _fetch_project_access(current_user, target_project_id)
+        if not allowed:
+            return ApiResponse.error("Access denied to target project", 403, error_details={"code": "PROJECT_ACCESS_DENIED"}).to_response()
+
+    # 复制规则
+    new_rule = source_rule.copy_to_user(
+        target_user_id=current_user.id,
+        new_name=new_name,
+        target_project_id=target_project_id
+    )
+    invalidate_user_caches(current_user.id)
+
+    return ApiResponse.created(
+        new_rule.to_dict(include_project=True),
+        "Rule copied successfully"
+    ).to_response()
 
 
 @context_rules_bp.route('/global', methods=['GET'])
 @unified_auth_required
 def get_global_context_rules():
     """获取全局上下文规则"""
-    try:
-        current_user = get_current_user()
-        args = get_request_args()
-        cache_key = f"user:{current_user.id}:global:q:{request.query_string.decode('utf-8')}"
-        cached = _context_rules_cache_get(cache_key)
-        if cached is not None:
-            return ApiResponse.success(cached, "Global context rules retrieved successfully").to_response()
-
-        # 构建查询 - 获取全局规则（is_global=True 或 project_id为空且is_public=True）
-        query = ContextRule.query.filter(
-            db.or_(
-                ContextRule.is_global == True,
-                db.and_(
-                    ContextRule.project_id.is_(None),
-                    ContextRule.is_public == True
-                )
+    current_user = get_current_user()
+    args = get_request_args()
+    cache_key = f"user:{current_user.id}:global:q:{request.query_string.decode('utf-8')}"
+    cached = _context_rules_cache_get(cache_key)
+    if cached is not None:
+        return ApiResponse.success(cached, "Global context rules retrieved successfully").to_response()
+
+    # 构建查询 - 获取全局规则（is_global=True 或 project_id为空且is_public=True）
+    query = ContextRule.query.filter(
+        db.or_(
+            ContextRule.is_global == True,
+            db.and_(
+                ContextRule.project_id.is_(None),
+                ContextRule.is_public == True
             )
         )
+    )
 
-        # 只显示激活的规则
-        if args.get('is_active') is not False:
-            query = query.filter(ContextRule.is_active == True)
-
-        # 排序
-        sort_by = args.get('sort_by', 'priority')
-        sort_order = args.get('sort_order', 'desc')
-
-        if sort_by == 'priority':
-            if sort_order == 'desc':
-                query = query.order_by(ContextRule.priority.desc())
-            else:
-                query = query.order_by(ContextRule.priority.asc())
-        elif sort_by == 'created_at':
-            if sort_order == 'desc':
-                query = query.order_by(ContextRule.created_at.desc())
-            else:
-                query = query.order_by(ContextRule.created_at.asc())
-        elif sort_by == 'name':
-            if sort_order == 'desc':
-                query = query.order_by(ContextRule.name.desc())
-            else:
-                query = query.order_by(ContextRule.name.asc())
-
-        rules = query.all()
-
-        result = [rule.to_dict(include_project=True) for rule in rules]
+    # 只显示激活的规则
+    if args.get('is_active') is not False:
+        query = query.filter(ContextRule.is_active == True)
 
-        _context_rules_cache_set(cache_key, result)
-        return ApiResponse.success(result, "Global context rules retrieved successfully").to_response()
+    # 排序
+    sort_by = args.get('sort_by', 'priority')
+    sort_order = args.get('sort_order', 'desc')
 
-    except Exception as e:
-        return ApiResponse.error(f"Failed to retrieve global context rules: {str(e)}", 500).to_response()
+    order_column = _RULE_SORT_COLUMNS.get(sort_by)
+    if order_column is not None:
+        query = query.order_by(order_column.desc() if sort_order == 'desc' else order_column.asc())
+
+    rules = query.options(*_rule_with_project_options()).all()
+
+    result = [rule.to_dict(include_project=True) for rule in rules]
+
+    _context_rules_cache_set(cache_key, result)
+    return ApiResponse.success(result, "Global context rules retrieved successfully").to_response()
 
 
 @context_rules_bp.route('/merged', methods=['GET'])
 @unified_auth_required
 def get_merged_context_rules():
     """获取合并后的上下文规则（用于AI）"""
-    try:
-        current_user = get_current_user()
-        args = get_request_args()
-        cache_key = f"user:{current_user.id}:merged:q:{request.query_string.decode('utf-8')}"
-        cached = _context_rules_cache_get(cache_key)
-        if cached is not None:
-            return ApiResponse.success(cached, "Merged context rules retrieved successfully").to_response()
-
-        project_id = args.get('project_id')
-
-        # 构建合并的上下文字符串
-        context_string = ContextRule.build_context_string(
-            project_id=project_id,
-            user_id=current_user.id,
-            for_tasks=True,
-            for_projects=True
-        )
-
-        # 获取应用的规则列表
-        rules_query = ContextRule.query.filter(
-            ContextRule.user_id == current_user.id,
-            ContextRule.is_active == True
-        )
-
-        if project_id:
-            # 包含项目特定规则和全局规则
-            rules_query = rules_query.filter(
-                db.or_(
-                    ContextRule.project_id == project_id,
-                    ContextRule.project_id.is_(None)
-                )
-            )
-        else:
-            # 只包含全局规则
-            rules_query = rules_query.filter(ContextRule.project_id.is_(None))
+    current_user = get_current_user()
+    args = get_request_args()
+    cache_key = f"user:{current_user.id}:merged:q:{request.query_string.decode('utf-8')}"
+    cached = _context_rules_cache_get(cache_key)
+    if cached is not None:
+        return ApiResponse.success(cached, "Merged context rules retrieved successfully").to_response()
 
-        rules = rules_query.order_by(ContextRule.priority.desc()).all()
+    project_id = args.get('project_id')
 
-        result = {
-            'content': context_string,
-            'rules': [rule.to_dict(include_project=True) for rule in rules]
-        }
+    # 合并的上下文字符串与范围内启用的规则来自同一次查询
+    context_string, rules = ContextRule.build_context_and_rules(
+        project_id=project_id,
+        user_id=current_user.id,
+        for_tasks=True,
+        for_projects=True
+    )
 
-        _context_rules_cache_set(cache_key, result)
-        return ApiResponse.success(result, "Merged context rules retrieved successfully").to_response()
+    result = {
+        'content': context_string,
+        'rules': [rule.to_dict(include_project=True) for rule in rules]
+    }
 
-    except Exception as e:
-        return ApiResponse.error(f"Failed to retrieve merged context rules: {str(e)}", 500).to_response()
+    _context_rules_cache_set(cache_key, result)
+    return ApiResponse.success(result, "Merged context rules retrieved successfully").to_response()
 
 
 @context_rules_bp.route('/preview', methods=['GET'])
 @unified_auth_required
 def preview_merged_rules():
     """预览合并后的上下文规则"""
-    try:
-        current_user = get_current_user()
-        args = get_request_args()
-
-        project_id = args.get('project_id')
-
-        # 构建预览的上下文字符串（与merged相同的逻辑）
-        context_string = ContextRule.build_context_string(
-            project_id=project_id,
-            user_id=current_user.id,
-            for_tasks=True,
-            for_projects=True
-        )
-
-        # 获取将要应用的规则列表
-        rules_query = ContextRule.query.filter(
-            ContextRule.user_id == current_user.id,
-            ContextRule.is_active == True
-        )
-
-        if project_id:
-            # 包含项目特定规则和全局规则
-            rules_query = rules_query.filter(
-                db.or_(
-                    ContextRule.project_id == project_id,
-                    ContextRule.project_id.is_(None)
-                )
-            )
-        else:
-            # 只包含全局规则
-            rules_query = rules_query.filter(ContextRule.project_id.is_(None))
-
-        rules = rules_query.order_by(ContextRule.priority.desc()).all()
-
-        # 添加预览特定的信息
-        result = {
-            'content': context_string,
-            'rules': [rule.to_dict(include_project=True) for rule in rules],
-            'preview_info': {
-                'total_rules': len(rules),
-                'project_id': project_id,
-                'content_length': len(context_string),
-                'generated_at': datetime.utcnow().isoformat()
-            }
+    current_user = get_current_user()
+    args = get_request_args()
+
+    project_id = args.get('project_id')
+
+    # 与 merged 相同的逻辑：上下文字符串与范围内启用的规则来自同一次查询
+    context_string, rules = ContextRule.build_context_and_rules(
+        project_id=project_id,
+        user_id=current_user.id,
+        for_tasks=True,
+        for_projects=True
+    )
+
+    # 添加预览特定的信息
+    result = {
+        'content': context_string,
+        'rules': [rule.to_dict(include_project=True) for rule in rules],
+        'preview_info': {
+            'total_rules': len(rules),
+            'project_id': project_id,
+            'content_length': len(context_string),
+            'generated_at': datetime.utcnow().isoformat()
         }
+    }
 
-        return ApiResponse.success(result, "Context rules preview generated successfully").to_response()
-
-    except Exception as e:
-        return ApiResponse.error(f"Failed to generate context rules preview: {str(e)}", 500).to_response()
+    return ApiResponse.success(result, "Context rules preview generated successfully").to_response()
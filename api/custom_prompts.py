@@ -2,13 +2,94 @@
 自定义提示词API端点
 """
 
+from datetime import datetime
 from flask import Blueprint, request
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer
 from models import db, CustomPrompt, PromptType
-from .base import ApiResponse, paginate_query, validate_json_request, get_request_args, APIException, handle_api_error
+from models.base import strict_loading_options
+from .base import (
+    ApiResponse, paginate_query, paginate_query_fast, validate_json_request, get_request_args, get_bool_arg,
+    APIException, handle_api_error, encode_keyset_cursor, decode_keyset_cursor,
+)
 from core.auth import unified_auth_required, get_current_user
 from core.cache_invalidation import invalidate_user_caches
 
 custom_prompts_bp = Blueprint('custom_prompts', __name__)
+# 提示词类型取值到枚举的映射：直接查表，非法值不经过 Enum 构造的异常路径
+_PROMPT_TYPES = {member.value: member for member in PromptType}
+
+
+# 导出接口返回的列（与 CustomPrompt.to_dict() 一致）
+_PROMPT_EXPORT_COLUMNS = (
+    CustomPrompt.id,
+    CustomPrompt.user_id,
+    CustomPrompt.prompt_type,
+    CustomPrompt.name,
+    CustomPrompt.content,
+    CustomPrompt.description,
+    CustomPrompt.is_active,
+    CustomPrompt.order_index,
+    CustomPrompt.created_at,
+    CustomPrompt.updated_at,
+)
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _prompt_row_to_dict(row):
+    return {
+        'id': row.id,
+        'user_id': row.user_id,
+        'prompt_type': row.prompt_type.value,
+        'name': row.name,
+        'content': row.content,
+        'description': row.description,
+        'is_active': row.is_active,
+        'order_index': row.order_index,
+        'created_at': _isoformat(row.created_at),
+        'updated_at': _isoformat(row.updated_at),
+    }
+
+
+def _parse_prompt_type(value):
+    """解析提示词类型，非法值（含非字符串）返回 None"""
+    if not isinstance(value, str):
+        return None
+    return _PROMPT_TYPES.get(value)
+
+
+def _prompt_cursor_filter(cursor):
+    """
+    游标分页条件：列表按 (order_index ASC, created_at DESC, id DESC) 排序，
+    取排在游标记录之后的行；order_index 可能为 NULL（MySQL 升序时排在最前）
+    """
+    order_index, created_at, prompt_id = decode_keyset_cursor(cursor, 3)
+    try:
+        created_at = datetime.fromisoformat(created_at)
+        prompt_id = int(prompt_id)
+        if order_index is not None:
+            order_index = int(order_index)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+    same_order_after = or_(
+        CustomPrompt.created_at < created_at,
+        and_(CustomPrompt.created_at == created_at, CustomPrompt.id < prompt_id)
+    )
+    if order_index is None:
+        return or_(
+            CustomPrompt.order_index.isnot(None),
+            and_(CustomPrompt.order_index.is_(None), same_order_after)
+        )
+    return or_(
+        CustomPrompt.order_index > order_index,
+        and_(CustomPrompt.order_index == order_index, same_order_after)
+    )
 
 
 @custom_prompts_bp.route('', methods=['GET'])
@@ -23,26 +104,66 @@ def get_custom_prompts():
         prompt_type = args.get('prompt_type')  # 'project' 或 'task_button'
         is_active = args.get('is_active', True)  # 默认只返回激活的
 
+        # include_content=false 时不查询、不返回提示词正文（TEXT 列，列表页通常只需名称与排序）
+        include_content = get_bool_arg('include_content', True)
+
         # 构建查询
-        query = CustomPrompt.query.filter(CustomPrompt.user_id == current_user.id)
+        query = CustomPrompt.query.options(*strict_loading_options()).filter(CustomPrompt.user_id == current_user.id)
+        if not include_content:
+            query = query.options(defer(CustomPrompt.content))
         
         if prompt_type:
-            try:
-                prompt_type_enum = PromptType(prompt_type)
-                query = query.filter(CustomPrompt.prompt_type == prompt_type_enum)
-            except ValueError:
+            prompt_type_enum = _parse_prompt_type(prompt_type)
+            if prompt_type_enum is None:
                 return ApiResponse.error("Invalid prompt_type. Must be 'project' or 'task_button'", 400).to_response()
+            query = query.filter(CustomPrompt.prompt_type == prompt_type_enum)
         
         if is_active is not None:
             query = query.filter(CustomPrompt.is_active == is_active)
         
-        # 排序：按order_index升序，然后按创建时间降序
-        query = query.order_by(CustomPrompt.order_index.asc(), CustomPrompt.created_at.desc())
+        # 排序：按order_index升序，然后按创建时间降序（id 保证同值时顺序稳定）
+        query = query.order_by(CustomPrompt.order_index.asc(), CustomPrompt.created_at.desc(), CustomPrompt.id.desc())
         
         # 手动分页
         page = args['page']
         per_page = min(args['per_page'], 100)  # 限制最大每页数量
 
+        # 传入 cursor 参数（首页为空串）时使用游标分页：不执行 COUNT，也不使用 OFFSET
+        if 'cursor' in request.args:
+            cursor = request.args.get('cursor')
+            if cursor:
+                try:
+                    query = query.filter(_prompt_cursor_filter(cursor))
+                except ValueError:
+                    return ApiResponse.error("Invalid cursor", 400).to_response()
+
+            prompts = query.limit(per_page + 1).all()
+            has_next = len(prompts) > per_page
+            if has_next:
+                del prompts[per_page:]
+            next_cursor = None
+            if has_next:
+                last = prompts[-1]
+                next_cursor = encode_keyset_cursor(last.order_index, last.created_at, last.id)
+
+            result = {
+                'items': [prompt.to_dict(include_content=include_content) for prompt in prompts],
+                'pagination': {
+                    'per_page': per_page,
+                    'has_next': has_next,
+                    'next_cursor': next_cursor,
+                }
+            }
+            return ApiResponse.success(result, "Custom prompts retrieved successfully").to_response()
+
+        # include_total=false 时不执行 COUNT，多取一条判断是否有下一页（响应不含 total/pages）
+        if not get_bool_arg('include_total', True):
+            result = paginate_query_fast(
+                query, page, per_page,
+                serialize=lambda prompt: prompt.to_dict(include_content=include_content)
+            )
+            return ApiResponse.success(result, "Custom prompts retrieved successfully").to_response()
+
         # 执行分页查询
         pagination = query.paginate(
             page=page,
@@ -51,7 +172,7 @@ def get_custom_prompts():
         )
 
         result = {
-            'items': [prompt.to_dict() for prompt in pagination.items],
+            'items': [prompt.to_dict(include_content=include_content) for prompt in pagination.items],
             'pagination': {
                 'page': pagination.page,
                 'per_page': pagination.per_page,
@@ -81,13 +202,9 @@ def create_custom_prompt():
             optional_fields=['description', 'order_index']
         )
 
-        if isinstance(data, tuple):  # 错误响应
-            return data
-        
         # 验证prompt_type
-        try:
-            prompt_type = PromptType(data['prompt_type'])
-        except ValueError:
+        prompt_type = _parse_prompt_type(data['prompt_type'])
+        if prompt_type is None:
             return ApiResponse.error("Invalid prompt_type. Must be 'project' or 'task_button'", 400).to_response()
         
         # 验证名称长度
@@ -97,16 +214,6 @@ def create_custom_prompt():
         if len(data['name']) > 255:
             return ApiResponse.error("Name too long (max 255 characters)", 400).to_response()
         
-        # 检查同类型下名称是否重复
-        existing = CustomPrompt.query.filter(
-            CustomPrompt.user_id == current_user.id,
-            CustomPrompt.prompt_type == prompt_type,
-            CustomPrompt.name == data['name'].strip()
-        ).first()
-        
-        if existing:
-            return ApiResponse.error(f"A {prompt_type.value} prompt with this name already exists", 400).to_response()
-        
         # 获取排序索引
         order_index = data.get('order_index', 0)
         if prompt_type == PromptType.TASK_BUTTON and order_index == 0:
@@ -127,11 +234,20 @@ def create_custom_prompt():
             order_index=order_index
         )
         
+        # 同类型重名由唯一约束 uq_custom_prompts_user_type_name 判定，不再先查询，也没有并发窗口
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return ApiResponse.error(f"A {prompt_type.value} prompt with this name already exists", 400).to_response()
+
+        # 提交前构建响应，避免提交后过期回表
+        prompt_dict = prompt.to_dict()
         db.session.commit()
-        invalidate_user_caches(current_user.id)
+        invalidate_user_caches(prompt_dict['user_id'])
         
         return ApiResponse.success(
-            prompt.to_dict(),
+            prompt_dict,
             f"{prompt_type.value.title()} prompt created successfully"
         ).to_response()
         
@@ -171,9 +287,6 @@ def update_custom_prompt(prompt_id):
             optional_fields=['name', 'content', 'description', 'is_active', 'order_index']
         )
 
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
         prompt = CustomPrompt.query.filter(
             CustomPrompt.id == prompt_id,
             CustomPrompt.user_id == current_user.id
@@ -263,9 +376,10 @@ def get_project_prompts():
         args = get_request_args()
         
         is_active = args.get('is_active', True)
-        prompts = CustomPrompt.get_user_project_prompts(current_user.id, is_active)
+        include_content = get_bool_arg('include_content', True)
+        prompts = CustomPrompt.get_user_project_prompts(current_user.id, is_active, include_content)
         
-        result = [prompt.to_dict() for prompt in prompts]
+        result = [prompt.to_dict(include_content=include_content) for prompt in prompts]
         
         return ApiResponse.success(result, "Project prompts retrieved successfully").to_response()
         
@@ -282,9 +396,10 @@ def get_task_button_prompts():
         args = get_request_args()
         
         is_active = args.get('is_active', True)
-        prompts = CustomPrompt.get_user_task_button_prompts(current_user.id, is_active)
+        include_content = get_bool_arg('include_content', True)
+        prompts = CustomPrompt.get_user_task_button_prompts(current_user.id, is_active, include_content)
         
-        result = [prompt.to_dict() for prompt in prompts]
+        result = [prompt.to_dict(include_content=include_content) for prompt in prompts]
         
         return ApiResponse.success(result, "Task button prompts retrieved successfully").to_response()
         
@@ -302,9 +417,6 @@ def reorder_task_button_prompts():
             required_fields=['prompt_orders']
         )
 
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
         prompt_orders = data['prompt_orders']
         if not isinstance(prompt_orders, list):
             return ApiResponse.error("prompt_orders must be a list", 400).to_response()
@@ -381,8 +493,8 @@ def initialize_user_defaults():
         if not language:
             # 从用户设置中获取语言
             from models import UserSettings
-            user_settings = UserSettings.query.filter_by(user_id=current_user.id).first()
-            language = user_settings.language if user_settings else 'zh-CN'
+            # 只取语言列，不加载 settings_data
+            language = db.session.query(UserSettings.language).filter_by(user_id=current_user.id).scalar() or 'zh-CN'
 
         # 检查用户是否已有提示词
         existing_count = CustomPrompt.query.filter(CustomPrompt.user_id == current_user.id).count()
@@ -414,15 +526,17 @@ def reset_to_defaults():
         if not language:
             # 从用户设置中获取语言
             from models import UserSettings
-            user_settings = UserSettings.query.filter_by(user_id=current_user.id).first()
-            language = user_settings.language if user_settings else 'zh-CN'
+            # 只取语言列，不加载 settings_data
+            language = db.session.query(UserSettings.language).filter_by(user_id=current_user.id).scalar() or 'zh-CN'
 
-        # 删除用户现有的所有提示词
-        CustomPrompt.query.filter(CustomPrompt.user_id == current_user.id).delete()
+        # 删除用户现有的所有提示词：随后整体重建，无需同步会话中的实例；
+        # 删除与默认提示词写入在 initialize_user_defaults 中一并提交
+        user_id = current_user.id
+        CustomPrompt.query.filter(CustomPrompt.user_id == user_id).delete(synchronize_session=False)
 
         # 初始化默认提示词
-        CustomPrompt.initialize_user_defaults(current_user.id, language)
-        invalidate_user_caches(current_user.id)
+        CustomPrompt.initialize_user_defaults(user_id, language)
+        invalidate_user_caches(user_id)
 
         return ApiResponse.success(None, "Prompts reset to defaults successfully").to_response()
 
@@ -438,12 +552,17 @@ def export_custom_prompts():
     try:
         current_user = get_current_user()
 
-        prompts = CustomPrompt.query.filter(CustomPrompt.user_id == current_user.id).all()
+        # 只查询导出需要的列，直接由行元组构建字典，跳过ORM实例化
+        rows = db.session.execute(
+            select(*_PROMPT_EXPORT_COLUMNS)
+            .where(CustomPrompt.user_id == current_user.id)
+            .order_by(CustomPrompt.id)
+        ).all()
 
         export_data = {
             'user_id': current_user.id,
-            'export_time': db.func.now(),
-            'prompts': [prompt.to_dict() for prompt in prompts]
+            'export_time': datetime.utcnow().isoformat(),
+            'prompts': [_prompt_row_to_dict(row) for row in rows]
         }
 
         return ApiResponse.success(export_data, "Custom prompts exported successfully").to_response()
@@ -452,6 +571,35 @@ def export_custom_prompts():
         return handle_api_error(e, "Failed to export custom prompts")
 
 
+def _import_row(user_id, prompt_data):
+    """校验一条导入数据并转换为待插入的行，不合法（缺字段、类型不符、名称超长等）时返回 None"""
+    if not isinstance(prompt_data, dict):
+        return None
+
+    prompt_type = _parse_prompt_type(prompt_data.get('prompt_type'))
+    name = prompt_data.get('name')
+    content = prompt_data.get('content')
+    description = prompt_data.get('description')
+    order_index = prompt_data.get('order_index', 0)
+    if (
+        prompt_type is None
+        or not isinstance(name, str) or not name.strip() or len(name) > 255
+        or not isinstance(content, str)
+        or (description is not None and not isinstance(description, str))
+        or not isinstance(order_index, int) or isinstance(order_index, bool)
+    ):
+        return None
+
+    return {
+        'user_id': user_id,
+        'prompt_type': prompt_type,
+        'name': name,
+        'content': content,
+        'description': description,
+        'order_index': order_index,
+    }
+
+
 @custom_prompts_bp.route('/import', methods=['POST'])
 @unified_auth_required
 def import_custom_prompts():
@@ -462,13 +610,11 @@ def import_custom_prompts():
             required_fields=['prompts']
         )
 
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
         prompts_data = data['prompts']
         if not isinstance(prompts_data, list):
             return ApiResponse.error("prompts must be a list", 400).to_response()
 
+        user_id = current_user.id
         imported_count = 0
         skipped_count = 0
 
@@ -477,52 +623,48 @@ def import_custom_prompts():
             CustomPrompt.prompt_type,
             CustomPrompt.name
         ).filter(
-            CustomPrompt.user_id == current_user.id
+            CustomPrompt.user_id == user_id
         ).all()
         existing_names = {
             (row.prompt_type, row.name)
             for row in existing_rows
         }
         pending_names = set()
+        new_rows = []
 
         for prompt_data in prompts_data:
-            try:
-                # 验证必需字段
-                if not all(field in prompt_data for field in ['prompt_type', 'name', 'content']):
-                    skipped_count += 1
-                    continue
+            row = _import_row(user_id, prompt_data)
+            if row is None:
+                skipped_count += 1
+                continue
 
-                # 验证prompt_type
-                try:
-                    prompt_type = PromptType(prompt_data['prompt_type'])
-                except ValueError:
-                    skipped_count += 1
-                    continue
-
-                key = (prompt_type, prompt_data['name'])
-                if key in existing_names or key in pending_names:
-                    skipped_count += 1
-                    continue
-
-                # 创建提示词
-                CustomPrompt.create_prompt(
-                    user_id=current_user.id,
-                    prompt_type=prompt_type,
-                    name=prompt_data['name'],
-                    content=prompt_data['content'],
-                    description=prompt_data.get('description'),
-                    order_index=prompt_data.get('order_index', 0)
-                )
-
-                pending_names.add(key)
-                imported_count += 1
-
-            except Exception:
+            key = (row['prompt_type'], row['name'])
+            if key in existing_names or key in pending_names:
                 skipped_count += 1
                 continue
 
+            # 收集待插入的行，循环结束后批量写入
+            new_rows.append(row)
+            pending_names.add(key)
+            imported_count += 1
+
+        # 一次 executemany 写入全部新提示词：导入结果不需要主键，
+        # 避免工作单元为取回每行自增ID而逐条 INSERT（MySQL 不支持 RETURNING）。
+        # 仅大小写等排序规则差异的重名由唯一约束拦下：ON DUPLICATE KEY UPDATE id = id 只忽略唯一键冲突，
+        # 其他错误照常抛出；连接启用了 FOUND_ROWS，rowcount 无法区分冲突行，改为按写入前后的行数计算
+        if new_rows:
+            table = CustomPrompt.__table__
+            db.session.execute(
+                mysql_insert(table).on_duplicate_key_update(id=table.c.id),
+                new_rows
+            )
+            inserted_count = db.session.query(db.func.count(CustomPrompt.id)).filter(
+                CustomPrompt.user_id == user_id
+            ).scalar() - len(existing_rows)
+            skipped_count += imported_count - inserted_count
+            imported_count = inserted_count
         db.session.commit()
-        invalidate_user_caches(current_user.id)
+        invalidate_user_caches(user_id)
 
         result = {
             'imported_count': imported_count,
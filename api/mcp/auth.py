@@ -3,7 +3,7 @@ from functools import wraps
 
 from flask import g, jsonify, request
 
-from models import ApiToken
+from core.api_token_cache import verify_api_token
 
 
 def require_api_token_auth(f):
@@ -52,7 +52,7 @@ def require_api_token_auth(f):
 
         # 验证token
         token_verify_start = time.time()
-        api_token = ApiToken.verify_token(token)
+        api_token = verify_api_token(token)
         token_verify_duration = time.time() - token_verify_start
 
         current_app.logger.debug(f"[AUTH_VERIFY] {auth_id} Token verification completed", extra={
@@ -4,6 +4,7 @@ from datetime import datetime
 from flask import g, jsonify, request
 
 from api.base import handle_api_error
+from core.rate_limit import rate_limit
 
 from . import mcp_bp
 from .auth import require_api_token_auth
@@ -15,7 +16,6 @@ from .handlers import (
     list_user_projects,
     submit_task_feedback,
 )
-from .shared import rate_limit
 from .tool_catalog import MCP_TOOLS
 
 TOOL_HANDLERS = {
@@ -30,7 +30,7 @@ TOOL_HANDLERS = {
 
 @mcp_bp.route('/tools', methods=['GET'])
 @require_api_token_auth
-@rate_limit(max_requests=60, window_seconds=60)
+@rate_limit(60, 60, scope='mcp')
 def list_tools():
     """列出可用的MCP工具"""
     try:
@@ -44,7 +44,7 @@ def list_tools():
 
 @mcp_bp.route('/call', methods=['POST'])
 @require_api_token_auth
-@rate_limit(max_requests=60, window_seconds=60)
+@rate_limit(60, 60, scope='mcp')
 def call_tool():
     """调用MCP工具"""
     import logging
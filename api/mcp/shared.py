@@ -1,16 +1,9 @@
 import html
 import re
 import time
-from collections import defaultdict
-from functools import wraps
-
-from flask import g, jsonify, request
 
 from core.redis_client import get_json as redis_get_json, set_json as redis_set_json
 
-# 简单的内存频率限制器
-rate_limiter = defaultdict(list)
-
 # 用户项目统计缓存，降低重复聚合查询开销
 project_stats_cache = {}
 PROJECT_STATS_CACHE_TTL_SECONDS = 30
@@ -51,39 +44,6 @@ def _set_project_stats_cache(cache_key, task_stats_map, context_rules_map):
         project_stats_cache.pop(oldest_key, None)
 
 
-def rate_limit(max_requests=10, window_seconds=60):
-    """频率限制装饰器"""
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            # 获取客户端标识（IP地址或用户ID）
-            client_id = request.remote_addr
-            if hasattr(g, 'current_user') and g.current_user:
-                client_id = f"user_{g.current_user.id}"
-
-            current_time = time.time()
-
-            # 清理过期的请求记录
-            rate_limiter[client_id] = [
-                req_time for req_time in rate_limiter[client_id]
-                if current_time - req_time < window_seconds
-            ]
-
-            # 检查是否超过限制
-            if len(rate_limiter[client_id]) >= max_requests:
-                return jsonify({
-                    'error': 'Rate limit exceeded',
-                    'message': f'Maximum {max_requests} requests per {window_seconds} seconds'
-                }), 429
-
-            # 记录当前请求
-            rate_limiter[client_id].append(current_time)
-
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
-
-
 def sanitize_input(text):
     """清理输入，防止XSS攻击"""
     if not isinstance(text, str):
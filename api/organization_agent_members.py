@@ -67,8 +67,6 @@ def create_organization_agent(organization_id):
         required_fields=['name'],
         optional_fields=['description', 'capability_tags', 'allowed_project_ids'],
     )
-    if isinstance(data, tuple):
-        return data
 
     agent = Agent(
         workspace_id=organization_id,
@@ -138,8 +136,6 @@ def invite_organization_agent_member(organization_id):
         return ApiResponse.forbidden('Access denied').to_response()
 
     data = validate_json_request(required_fields=['agent_id'])
-    if isinstance(data, tuple):
-        return data
 
     agent_id = int(data['agent_id'])
     agent = Agent.query.get(agent_id)
@@ -14,7 +14,7 @@ from models import (
     OrganizationRoleDefinition,
     OrganizationMemberRole,
 )
-from ..base import ApiResponse, validate_json_request
+from ..base import ApiResponse, validate_json_request, APIException
 from core.auth import unified_auth_required, get_current_user
 
 from . import organizations_bp
@@ -77,8 +77,6 @@ def invite_organization_member(organization_id):
             required_fields=['email'],
             optional_fields=['role', 'role_ids']
         )
-        if isinstance(data, tuple):
-            return data
 
         target_user = User.query.filter_by(email=data['email']).first()
         if not target_user:
@@ -147,6 +145,8 @@ def invite_organization_member(organization_id):
             member.to_dict(include_user=True),
             "Organization member invited successfully"
         ).to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to invite organization member: {str(e)}", 500).to_response()
@@ -175,8 +175,6 @@ def update_organization_member(organization_id, user_id):
             return ApiResponse.not_found("Organization member not found").to_response()
 
         data = validate_json_request(optional_fields=['role', 'role_ids', 'status'])
-        if isinstance(data, tuple):
-            return data
 
         role_ids = None
         if 'role_ids' in data or 'role' in data:
@@ -225,6 +223,8 @@ def update_organization_member(organization_id, user_id):
             member.to_dict(include_user=True),
             "Organization member updated successfully"
         ).to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to update organization member: {str(e)}", 500).to_response()
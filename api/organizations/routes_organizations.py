@@ -12,7 +12,7 @@ from models import (
     OrganizationRoleDefinition,
     OrganizationMemberRole,
 )
-from ..base import ApiResponse, validate_json_request, get_request_args, paginate_query
+from ..base import ApiResponse, validate_json_request, APIException, get_request_args, paginate_query
 from core.auth import unified_auth_required, get_current_user
 from core.cache_invalidation import invalidate_user_caches
 
@@ -92,8 +92,6 @@ def create_organization():
             required_fields=['name'],
             optional_fields=['slug', 'description']
         )
-        if isinstance(data, tuple):
-            return data
 
         base_slug = data.get('slug') or Organization.slugify(data['name'])
         slug = base_slug
@@ -156,6 +154,8 @@ def create_organization():
         payload['current_user_role'] = 'owner'
         payload['current_user_roles'] = ['owner']
         return ApiResponse.created(payload, "Organization created successfully").to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to create organization: {str(e)}", 500).to_response()
@@ -194,8 +194,6 @@ def update_organization(organization_id):
         data = validate_json_request(
             optional_fields=['name', 'slug', 'description', 'status']
         )
-        if isinstance(data, tuple):
-            return data
 
         if 'slug' in data and data['slug'] and data['slug'] != organization.slug:
             existing = Organization.query.filter_by(slug=data['slug']).first()
@@ -237,6 +235,8 @@ def update_organization(organization_id):
         payload['current_user_role'] = current_user.get_organization_role(organization)
         payload['current_user_roles'] = current_user.get_organization_roles(organization)
         return ApiResponse.success(payload, "Organization updated successfully").to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to update organization: {str(e)}", 500).to_response()
@@ -7,7 +7,7 @@ from models import (
     OrganizationMemberRole,
     OrganizationMember,
 )
-from ..base import ApiResponse, validate_json_request
+from ..base import ApiResponse, validate_json_request, APIException
 from core.auth import unified_auth_required, get_current_user
 
 from . import organizations_bp
@@ -62,8 +62,6 @@ def create_organization_role(organization_id):
         _ensure_system_roles(organization_id, created_by=current_user.email)
 
         data = validate_json_request(optional_fields=['name', 'title', 'key', 'description', 'content'])
-        if isinstance(data, tuple):
-            return data
 
         role_title = str(data.get('title') or data.get('name') or '').strip()
         if not role_title:
@@ -93,6 +91,8 @@ def create_organization_role(organization_id):
         _invalidate_org_users(organization_id)
 
         return ApiResponse.created(role.to_dict(), "Organization role created successfully").to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to create organization role: {str(e)}", 500).to_response()
@@ -117,8 +117,6 @@ def update_organization_role(organization_id, role_id):
             return ApiResponse.not_found("Organization role not found").to_response()
 
         data = validate_json_request(optional_fields=['name', 'title', 'description', 'content', 'is_active'])
-        if isinstance(data, tuple):
-            return data
 
         if role.is_system and ('is_active' in data and not bool(data.get('is_active'))):
             return ApiResponse.error("Cannot disable system role", 400).to_response()
@@ -141,6 +139,8 @@ def update_organization_role(organization_id, role_id):
         db.session.commit()
         _invalidate_org_users(organization_id)
         return ApiResponse.success(role.to_dict(), "Organization role updated successfully").to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to update organization role: {str(e)}", 500).to_response()
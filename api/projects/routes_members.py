@@ -4,7 +4,7 @@ from datetime import datetime
 
 from models import db, User, Project, ProjectMember, ProjectMemberRole, ProjectMemberStatus
 from core.auth import unified_auth_required, get_current_user
-from ..base import validate_json_request, ApiResponse
+from ..base import validate_json_request, APIException, ApiResponse
 
 from . import projects_bp
 from .shared import _invalidate_project_users
@@ -55,8 +55,6 @@ def invite_project_member(project_id):
             required_fields=['email'],
             optional_fields=['role']
         )
-        if isinstance(data, tuple):
-            return data
 
         target_user = User.query.filter_by(email=data['email']).first()
         if not target_user:
@@ -96,6 +94,8 @@ def invite_project_member(project_id):
             member.to_dict(include_user=True),
             "Project member invited successfully"
         ).to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to invite project member: {str(e)}", 500).to_response()
@@ -123,8 +123,6 @@ def update_project_member(project_id, user_id):
             return ApiResponse.not_found("Project member not found").to_response()
 
         data = validate_json_request(optional_fields=['role', 'status'])
-        if isinstance(data, tuple):
-            return data
 
         if 'role' in data:
             try:
@@ -143,6 +141,8 @@ def update_project_member(project_id, user_id):
             member.to_dict(include_user=True),
             "Project member updated successfully"
         ).to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to update project member: {str(e)}", 500).to_response()
@@ -12,7 +12,7 @@ from models import (
     Organization,
 )
 from core.auth import unified_auth_required, get_current_user
-from ..base import validate_json_request, ApiResponse
+from ..base import validate_json_request, APIException, ApiResponse
 
 from . import projects_bp
 from .shared import _invalidate_project_users
@@ -39,9 +39,6 @@ def create_project():
             optional_fields=['description', 'color', 'status', 'github_url', 'local_url', 'production_url', 'project_context', 'organization_id']
         )
 
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
         # 检查项目名称是否已存在（在用户范围内）
         existing_project = Project.query.filter_by(
             name=data['name'],
@@ -114,6 +111,8 @@ def create_project():
             message="Project created successfully"
         ).to_response()
 
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to create project: {str(e)}", 500).to_response()
@@ -169,9 +168,6 @@ def update_project(project_id):
             optional_fields=['name', 'description', 'color', 'status', 'github_url', 'local_url', 'production_url', 'project_context', 'organization_id']
         )
 
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
         # 检查项目名称是否已被其他项目使用
         if 'name' in data and data['name'] != project.name:
             existing_project = Project.query.filter(
@@ -234,6 +230,8 @@ def update_project(project_id):
             "Project updated successfully"
         ).to_response()
 
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to update project: {str(e)}", 500).to_response()
@@ -5,7 +5,7 @@
 from flask import Blueprint, request
 from sqlalchemy import or_
 from models import db, TaskLabel, BUILTIN_TASK_LABELS, Project
-from .base import ApiResponse, validate_json_request
+from .base import ApiResponse, validate_json_request, APIException, get_bool_arg
 from core.auth import unified_auth_required, get_current_user
 from core.cache_invalidation import invalidate_user_caches
 
@@ -46,7 +46,7 @@ def list_task_labels():
     try:
         current_user = get_current_user()
         project_id = request.args.get('project_id', type=int)
-        include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
+        include_inactive = get_bool_arg('include_inactive', False)
 
         ensure_builtin_labels()
 
@@ -92,8 +92,6 @@ def create_task_label():
             required_fields=['name'],
             optional_fields=['project_id', 'color', 'description']
         )
-        if isinstance(data, tuple):
-            return data
 
         ensure_builtin_labels()
 
@@ -142,6 +140,8 @@ def create_task_label():
         invalidate_user_caches(current_user.id)
 
         return ApiResponse.created(label.to_dict(), "Task label created successfully").to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to create task label: {str(e)}", 500).to_response()
@@ -161,8 +161,6 @@ def update_task_label(label_id):
             return ApiResponse.forbidden("Access denied").to_response()
 
         data = validate_json_request(optional_fields=['name', 'color', 'description', 'is_active'])
-        if isinstance(data, tuple):
-            return data
 
         if 'name' in data and data['name']:
             new_name = data['name'].strip().lower()
@@ -184,6 +182,8 @@ def update_task_label(label_id):
         db.session.commit()
         invalidate_user_caches(current_user.id)
         return ApiResponse.success(label.to_dict(), "Task label updated successfully").to_response()
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to update task label: {str(e)}", 500).to_response()
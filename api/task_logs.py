@@ -66,8 +66,6 @@ def append_task_log_by_user(task_id):
         return ApiResponse.forbidden('Access denied').to_response()
 
     data = validate_json_request(required_fields=['content'], optional_fields=['content_type'])
-    if isinstance(data, tuple):
-        return data
 
     content = str(data['content']).strip()
     if not content:
@@ -135,8 +133,6 @@ def append_task_log_by_agent(task_id):
         return ApiResponse.forbidden('Access denied').to_response()
 
     data = validate_json_request(required_fields=['content'], optional_fields=['content_type'])
-    if isinstance(data, tuple):
-        return data
 
     content = str(data['content']).strip()
     if not content:
@@ -18,7 +18,7 @@ from models import (
     UserActivity,
     TaskEventOutbox,
 )
-from ..base import ApiResponse, paginate_query, paginate_query_fast, validate_json_request, get_request_args
+from ..base import ApiResponse, paginate_query, paginate_query_fast, validate_json_request, APIException, get_request_args, get_bool_arg
 from core.auth import unified_auth_required, get_current_user
 from ..agent_trigger_engine import emit_task_event
 from ..notification_service import create_task_notifications, enqueue_pending_deliveries_for_events
@@ -132,7 +132,7 @@ def list_tasks():
             query = query.order_by(order_column.asc())
         
         # 分页：默认使用快速分页，避免大数据量下 COUNT(*) 成为瓶颈
-        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        include_total = get_bool_arg('include_total', False)
         if include_total:
             result = paginate_query(query, args['page'], args['per_page'])
         else:
@@ -184,9 +184,6 @@ def create_task():
             ]
         )
 
-        if isinstance(data, tuple):  # 错误响应
-            return data
-
         # 验证项目是否存在
         project = Project.query.get(data['project_id'])
         if not project:
@@ -378,6 +375,8 @@ def create_task():
             "Task created successfully"
         ).to_response()
         
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to create task: {str(e)}", 500).to_response()
@@ -430,9 +429,6 @@ def update_task(task_id):
                 'assignees', 'mentions', 'expected_revision'
             ]
         )
-        
-        if isinstance(data, tuple):  # 错误响应
-            return data
 
         if 'expected_revision' in data:
             try:
@@ -684,6 +680,8 @@ def update_task(task_id):
             "Task updated successfully"
         ).to_response()
         
+    except APIException as e:
+        return e.to_response()
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Failed to update task: {str(e)}", 500).to_response()
@@ -5,6 +5,8 @@ API Token管理接口
 from flask import Blueprint, request, jsonify, g
 from models import db, ApiToken, User
 from core.auth import unified_auth_required, get_current_user
+from core.api_token_cache import verify_api_token, invalidate_api_token_cache
+from core.cache_invalidation import invalidate_api_token_list_cache
 from api.base import ApiResponse
 
 tokens_bp = Blueprint('tokens', __name__)
@@ -76,6 +78,7 @@ def create_token():
 
         db.session.add(api_token)
         db.session.commit()
+        invalidate_api_token_list_cache(api_token.user_id)
         
         # 返回token信息（包含完整token，仅此一次）
         result = api_token.to_dict()
@@ -123,6 +126,8 @@ def update_token(token_id):
             api_token.is_active = data['is_active']
         
         db.session.commit()
+        invalidate_api_token_cache(api_token)
+        invalidate_api_token_list_cache(api_token.user_id)
         
         return ApiResponse.success(api_token.to_dict(), "Token updated successfully").to_response()
 
@@ -141,6 +146,9 @@ def renew_token(token_id):
         
         expires_days = data.get('expires_days')
         api_token.renew(expires_days)
+        # 续期前提交过的（已过期）Token 可能留有负缓存，续期后需立即可用
+        invalidate_api_token_cache(api_token)
+        invalidate_api_token_list_cache(api_token.user_id)
         
         return jsonify({
             'message': 'Token renewed successfully',
@@ -225,6 +233,8 @@ def delete_token(token_id):
         # 物理删除
         db.session.delete(api_token)
         db.session.commit()
+        invalidate_api_token_cache(api_token)
+        invalidate_api_token_list_cache(api_token.user_id)
 
         return jsonify({
             'message': 'Token deleted successfully'
@@ -244,7 +254,7 @@ def verify_token():
             return jsonify({'error': 'Token is required'}), 400
         
         token = data['token']
-        api_token = ApiToken.verify_token(token)
+        api_token = verify_api_token(token)
         
         if api_token:
             return jsonify({
@@ -5,14 +5,52 @@
 提供用户设置的增删改查功能
 """
 
+from datetime import datetime
+
 from flask import Blueprint, request, jsonify
 from core.auth import unified_auth_required, get_current_user
+from core.redis_client import (
+    get_json as redis_get_json,
+    set_json as redis_set_json,
+    delete_keys as redis_delete_keys,
+)
 from api.base import ApiResponse, handle_api_error
+from models import db
 from models.user_settings import UserSettings
 from models.user import User
 
 
 user_settings_bp = Blueprint('user_settings', __name__)
+CUSTOM_PROMPTS_CACHE_TTL_SECONDS = 30
+custom_prompts_fallback_cache = {}
+
+
+def _custom_prompts_cache_key(user_id):
+    return f"user-settings:custom-prompts:{user_id}"
+
+
+def _custom_prompts_cache_get(user_id):
+    cached = redis_get_json(_custom_prompts_cache_key(user_id))
+    if cached is not None:
+        return cached
+
+    item = custom_prompts_fallback_cache.get(user_id)
+    if item and (datetime.utcnow().timestamp() - item['cached_at'] <= CUSTOM_PROMPTS_CACHE_TTL_SECONDS):
+        return item['value']
+    return None
+
+
+def _custom_prompts_cache_set(user_id, value):
+    redis_set_json(_custom_prompts_cache_key(user_id), value, CUSTOM_PROMPTS_CACHE_TTL_SECONDS)
+    custom_prompts_fallback_cache[user_id] = {
+        'cached_at': datetime.utcnow().timestamp(),
+        'value': value,
+    }
+
+
+def _invalidate_custom_prompts_cache(user_id):
+    custom_prompts_fallback_cache.pop(user_id, None)
+    redis_delete_keys(_custom_prompts_cache_key(user_id))
 
 
 @user_settings_bp.route('', methods=['GET'])
@@ -60,9 +98,13 @@ def update_user_settings():
         if 'settings_data' in data:
             if not settings.settings_data:
                 settings.settings_data = {}
-            settings.settings_data.update(data['settings_data'])
+            # JSON 列不跟踪原地修改，重新赋值以确保写库
+            settings.settings_data = {**settings.settings_data, **data['settings_data']}
         
+        user_id = current_user.id
         settings.save()
+        if 'settings_data' in data:
+            _invalidate_custom_prompts_cache(user_id)
         
         return ApiResponse.success(settings.to_dict(), "User settings updated successfully").to_response()
         
@@ -108,14 +150,21 @@ def get_custom_prompts():
     """获取用户自定义的提示词配置"""
     try:
         current_user = get_current_user()
+        user_id = current_user.id
+        
+        # 优先读缓存，命中时不查询用户设置
+        custom_prompts = _custom_prompts_cache_get(user_id)
+        if custom_prompts is not None:
+            return ApiResponse.success(custom_prompts, "Custom prompts retrieved successfully").to_response()
         
         # 获取或创建用户设置
-        settings = UserSettings.get_or_create_for_user(current_user.id)
+        settings = UserSettings.get_or_create_for_user(user_id)
         
         # 从settings_data中获取自定义提示词
         custom_prompts = {}
         if settings.settings_data:
             custom_prompts = settings.settings_data.get('custom_prompts', {})
+        _custom_prompts_cache_set(user_id, custom_prompts)
         
         return ApiResponse.success(custom_prompts, "Custom prompts retrieved successfully").to_response()
         
@@ -138,21 +187,22 @@ def update_custom_prompts():
         
         data = request.get_json()
         
-        # 获取或创建用户设置
-        settings = UserSettings.get_or_create_for_user(current_user.id)
-        
-        # 确保settings_data存在
-        if not settings.settings_data:
-            settings.settings_data = {}
-        
-        # 更新自定义提示词配置
+        user_id = current_user.id
         if 'custom_prompts' in data:
-            settings.settings_data['custom_prompts'] = data['custom_prompts']
-        
-        settings.save()
+            custom_prompts = data['custom_prompts']
+            # 只改写 settings_data.custom_prompts，不读出、不整体写回其余设置
+            if not UserSettings.set_settings_key(user_id, 'custom_prompts', custom_prompts):
+                # 用户设置尚不存在时按默认值创建
+                settings = UserSettings.get_or_create_for_user(user_id)
+                settings.settings_data = {**(settings.settings_data or {}), 'custom_prompts': custom_prompts}
+            db.session.commit()
+            _invalidate_custom_prompts_cache(user_id)
+        else:
+            settings_data = UserSettings.get_or_create_for_user(user_id).settings_data or {}
+            custom_prompts = settings_data.get('custom_prompts', {})
         
         return ApiResponse.success(
-            settings.settings_data.get('custom_prompts', {}),
+            custom_prompts,
             "Custom prompts updated successfully"
         ).to_response()
         
@@ -14,6 +14,7 @@ import threading
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # 导入模型和配置
 from models import db
@@ -22,6 +23,7 @@ from core.middleware import setup_all_middleware
 from core.github_config import github_service
 from core.google_config import google_service
 from core.redis_client import get_redis_client
+from core.json_provider import OrjsonProvider
 
 
 def create_app(config_name=None):
@@ -30,12 +32,19 @@ def create_app(config_name=None):
         config_name = os.environ.get('FLASK_ENV', 'development')
     
     app = Flask(__name__)
+    # orjson 同时用于 jsonify 输出与 request.get_json() 解析
+    app.json = OrjsonProvider(app)
     # 兼容 /path 与 /path/，避免前端请求尾斜杠时出现误判 404
     app.url_map.strict_slashes = False
     app.config.from_object(config[config_name])
     
     # 初始化配置
     config[config_name].init_app(app)
+
+    # 部署在反向代理之后时，从 X-Forwarded-* 还原客户端地址与协议（频率限制按客户端IP计数）
+    proxy_hops = app.config.get('PROXY_FIX_X_FOR', 0)
+    if proxy_hops > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
     
     # 初始化扩展
     db.init_app(app)
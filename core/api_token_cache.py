@@ -0,0 +1,181 @@
+"""
+API Token 校验缓存
+
+以 sha256(token) 为键缓存已解析的 Token 信息，命中时按主键加载 Token，不再按哈希查库，
+使用统计先在 Redis 中累加、定期批量写回，每次请求不再单独 UPDATE + COMMIT；
+校验失败的哈希短期记入负缓存，反复提交的无效 Token 不再落到数据库
+"""
+
+import hashlib
+import hmac
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import joinedload
+
+from models import db, ApiToken
+from core.redis_client import (
+    get_redis_client,
+    get_json as redis_get_json,
+    set_json as redis_set_json,
+    delete_keys as redis_delete_keys,
+)
+
+API_TOKEN_CACHE_TTL_SECONDS = 300
+API_TOKEN_NEGATIVE_CACHE_TTL_SECONDS = 60
+# 缓存命中的使用次数/最近使用时间在 Redis 中累加，每个周期由一个请求批量写回数据库
+API_TOKEN_USAGE_FLUSH_INTERVAL_SECONDS = 60
+_API_TOKEN_USAGE_COUNTS_KEY = "api-token:usage:counts"
+_API_TOKEN_USAGE_LAST_USED_KEY = "api-token:usage:last-used"
+_API_TOKEN_USAGE_FLUSH_LOCK_KEY = "api-token:usage:flush-lock"
+
+
+def _api_token_cache_key(token_hash):
+    return f"api-token:{token_hash}"
+
+
+def _api_token_negative_cache_key(token_hash):
+    return f"api-token:neg:{token_hash}"
+
+
+def _looks_like_jwt(token):
+    """JWT 由三段 base64url 以 '.' 连接，API Token 字符集（token_urlsafe）不含 '.'"""
+    return token.count('.') == 2
+
+
+def _api_token_cache_get(token_hash):
+    cached = redis_get_json(_api_token_cache_key(token_hash))
+    if not cached:
+        return None
+
+    expires_at = cached.get('expires_at')
+    if expires_at and datetime.fromisoformat(expires_at) < datetime.utcnow():
+        return None
+    return cached
+
+
+def _api_token_cache_set(api_token):
+    ttl = API_TOKEN_CACHE_TTL_SECONDS
+    if api_token.expires_at:
+        seconds_until_expiry = int((api_token.expires_at - datetime.utcnow()).total_seconds())
+        ttl = min(ttl, seconds_until_expiry)
+    if ttl <= 0:
+        return
+
+    redis_set_json(_api_token_cache_key(api_token.token_hash), {
+        'token_id': api_token.id,
+        'user_id': api_token.user_id,
+        'expires_at': api_token.expires_at.isoformat() if api_token.expires_at else None,
+    }, ttl)
+
+
+def invalidate_api_token_cache(api_token):
+    """Token 更新/删除后清理校验缓存"""
+    if api_token is None or not api_token.token_hash:
+        return
+    redis_delete_keys(
+        _api_token_cache_key(api_token.token_hash),
+        _api_token_negative_cache_key(api_token.token_hash),
+    )
+
+
+def _write_usage(rows):
+    """
+    批量累加使用统计；rows 为 {'b_id', 'b_count', 'b_last_used'} 列表
+
+    使用独立连接提交，不影响（也不提交）当前请求的会话
+    """
+    table = ApiToken.__table__
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values(
+                usage_count=func.coalesce(table.c.usage_count, 0) + bindparam('b_count'),
+                last_used_at=bindparam('b_last_used'),
+            ),
+            rows
+        )
+
+
+def flush_api_token_usage(client=None):
+    """将 Redis 中累加的使用统计写回数据库，返回写回的 Token 数"""
+    client = client or get_redis_client()
+    if not client:
+        return 0
+
+    # 取出并清空在同一事务中完成，并发请求的新增计数留待下个周期
+    pipe = client.pipeline()
+    pipe.hgetall(_API_TOKEN_USAGE_COUNTS_KEY)
+    pipe.hgetall(_API_TOKEN_USAGE_LAST_USED_KEY)
+    pipe.delete(_API_TOKEN_USAGE_COUNTS_KEY, _API_TOKEN_USAGE_LAST_USED_KEY)
+    counts, last_used, _ = pipe.execute()
+    if not counts:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'b_id': int(token_id),
+            'b_count': int(count),
+            'b_last_used': datetime.fromisoformat(last_used[token_id]) if token_id in last_used else now,
+        }
+        for token_id, count in counts.items()
+    ]
+    _write_usage(rows)
+    return len(rows)
+
+
+def _record_cached_usage(api_token):
+    """
+    记录一次缓存命中的使用：Redis 中累加，每个刷新周期第一个拿到锁的请求负责批量写回，
+    因此 usage_count/last_used_at 在数据库中最多滞后一个周期；Redis 出错时直接写库
+    """
+    now = datetime.utcnow()
+    client = get_redis_client()
+    if client:
+        try:
+            pipe = client.pipeline()
+            pipe.hincrby(_API_TOKEN_USAGE_COUNTS_KEY, api_token.id, 1)
+            pipe.hset(_API_TOKEN_USAGE_LAST_USED_KEY, api_token.id, now.isoformat())
+            pipe.set(_API_TOKEN_USAGE_FLUSH_LOCK_KEY, 1, nx=True, ex=API_TOKEN_USAGE_FLUSH_INTERVAL_SECONDS)
+            _, _, should_flush = pipe.execute()
+            if should_flush:
+                flush_api_token_usage(client)
+            return
+        except Exception as e:
+            current_app.logger.warning(f"API token usage counter unavailable, write through: {e}")
+
+    _write_usage([{'b_id': api_token.id, 'b_count': 1, 'b_last_used': now}])
+
+
+def verify_api_token(token):
+    """
+    校验 API Token（带缓存）
+
+    命中缓存时仅按主键加载 Token（并以数据库中的状态复核），使用统计经 Redis 累加后批量写回；
+    未命中时回退到 ApiToken.verify_token，由其直接更新使用统计
+    """
+    if not token or _looks_like_jwt(token):
+        return None
+
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    cached = _api_token_cache_get(token_hash)
+    if cached is not None:
+        # 调用方总会访问 api_token.user，随 Token 一并加载避免额外的懒加载查询
+        api_token = ApiToken.query.options(joinedload(ApiToken.user)).get(cached['token_id'])
+        # 以数据库中的当前状态为准，防止缓存失效遗漏导致已停用的Token继续可用
+        if api_token and api_token.is_active and hmac.compare_digest(api_token.token_hash, token_hash) and not api_token.is_expired():
+            _record_cached_usage(api_token)
+            return api_token
+        redis_delete_keys(_api_token_cache_key(token_hash))
+
+    # 负缓存只放在 Redis：进程内字典会被大量随机 Token 撑大
+    negative_key = _api_token_negative_cache_key(token_hash)
+    if redis_get_json(negative_key) is not None:
+        return None
+
+    api_token = ApiToken.verify_token(token, token_hash=token_hash)
+    if api_token:
+        _api_token_cache_set(api_token)
+    else:
+        redis_set_json(negative_key, 1, API_TOKEN_NEGATIVE_CACHE_TTL_SECONDS)
+    return api_token
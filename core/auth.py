@@ -5,20 +5,25 @@
 from functools import wraps
 from flask import request, jsonify, g
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request, jwt_required as flask_jwt_required
-from models import ApiToken, User
+from models import User
 from api.base import ApiResponse
+from core.api_token_cache import verify_api_token
+
+
+def extract_bearer_token(auth_header):
+    """从 Authorization 头中截取 Bearer Token，格式不符时返回 None"""
+    # 单次长度检查 + 切片，避免 split 分配列表；认证方案名不区分大小写
+    if not auth_header or len(auth_header) < 8 or auth_header[:7].lower() != 'bearer ':
+        return None
+    return auth_header[7:].strip() or None
 
 
 def token_required(f):
     """Token认证装饰器"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
-        
         # 从Authorization header获取token
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
+        token = extract_bearer_token(request.headers.get('Authorization'))
         
         # 从query参数获取token（备用方式）
         if not token:
@@ -28,7 +33,7 @@ def token_required(f):
             return ApiResponse.unauthorized('Token is missing').to_response()
         
         # 验证token
-        api_token = ApiToken.verify_token(token)
+        api_token = verify_api_token(token)
         if not api_token:
             return ApiResponse.unauthorized('Invalid token').to_response()
         
@@ -44,12 +49,8 @@ def optional_token_auth(f):
     """可选的Token认证装饰器"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
-        
         # 从Authorization header获取token
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
+        token = extract_bearer_token(request.headers.get('Authorization'))
         
         # 从query参数获取token（备用方式）
         if not token:
@@ -57,7 +58,7 @@ def optional_token_auth(f):
         
         # 如果有token，验证它
         if token:
-            api_token = ApiToken.verify_token(token)
+            api_token = verify_api_token(token)
             if api_token:
                 g.current_token = api_token
             else:
@@ -80,54 +81,63 @@ def is_authenticated():
     return get_current_token() is not None
 
 
-def unified_auth_required(f):
+def authenticate_request(optional=False):
     """
-    统一认证装饰器 - 同时支持JWT和API Token认证
+    统一认证 - 同时支持JWT和API Token认证，结果写入g
 
     认证优先级：
     1. 首先尝试API Token认证
     2. 如果没有API Token，尝试JWT认证
     3. 将认证成功的用户信息存储到g.current_user
+
+    返回是否认证成功；optional=True 时认证失败会把g中的认证信息置为None
     """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        current_user = None
-        auth_method = None
+    # 1. 尝试API Token认证
+    token = extract_bearer_token(request.headers.get('Authorization'))
+    if token:
+        # 验证API Token
+        api_token = verify_api_token(token)
+        if api_token:
+            g.current_token = api_token
+            g.current_user = api_token.user
+            g.auth_method = 'api_token'
+            return True
+
+    # 2. 尝试JWT认证
+    # 注意：仅捕获JWT解析/校验异常，不能吞掉业务处理函数内部异常
+    user_id = None
+    try:
+        verify_jwt_in_request(optional=optional)
+        user_id = get_jwt_identity()
+    except Exception:
+        # JWT验证失败，继续尝试其他认证方式
+        user_id = None
+    if user_id:
+        current_user = User.query.get(user_id)
+        if current_user and current_user.is_active():
+            g.current_user = current_user
+            g.current_token = None
+            g.auth_method = 'jwt'
+            return True
 
-        # 1. 尝试API Token认证
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
+    # 3. 没有认证或认证失败
+    if optional:
+        g.current_user = None
+        g.current_token = None
+        g.auth_method = None
+    return False
 
-            # 验证API Token
-            api_token = ApiToken.verify_token(token)
-            if api_token:
-                current_user = api_token.user
-                auth_method = 'api_token'
-                g.current_token = api_token
-                g.current_user = current_user
-                g.auth_method = auth_method
-                return f(*args, **kwargs)
 
-        # 2. 尝试JWT认证
-        # 注意：仅捕获JWT解析/校验异常，不能吞掉业务处理函数内部异常
-        user_id = None
-        try:
-            verify_jwt_in_request()
-            user_id = get_jwt_identity()
-        except Exception:
-            # JWT验证失败，继续尝试其他认证方式
-            user_id = None
-        if user_id:
-            current_user = User.query.get(user_id)
-            if current_user and current_user.is_active():
-                auth_method = 'jwt'
-                g.current_user = current_user
-                g.current_token = None
-                g.auth_method = auth_method
-                return f(*args, **kwargs)
+def unified_auth_required(f):
+    """
+    统一认证装饰器 - 同时支持JWT和API Token认证
 
-        # 3. 认证失败
+    认证流程见 authenticate_request，失败时返回401
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if authenticate_request():
+            return f(*args, **kwargs)
         return ApiResponse.unauthorized('Authentication required').to_response()
 
     return decorated_function
@@ -142,46 +152,7 @@ def optional_unified_auth(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        current_user = None
-        auth_method = None
-
-        # 1. 尝试API Token认证
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-
-            # 验证API Token
-            api_token = ApiToken.verify_token(token)
-            if api_token:
-                current_user = api_token.user
-                auth_method = 'api_token'
-                g.current_token = api_token
-                g.current_user = current_user
-                g.auth_method = auth_method
-                return f(*args, **kwargs)
-
-        # 2. 尝试JWT认证
-        # 注意：仅捕获JWT解析/校验异常，不能吞掉业务处理函数内部异常
-        user_id = None
-        try:
-            verify_jwt_in_request(optional=True)
-            user_id = get_jwt_identity()
-        except Exception:
-            # JWT验证失败，继续
-            user_id = None
-        if user_id:
-            current_user = User.query.get(user_id)
-            if current_user and current_user.is_active():
-                auth_method = 'jwt'
-                g.current_user = current_user
-                g.current_token = None
-                g.auth_method = auth_method
-                return f(*args, **kwargs)
-
-        # 3. 没有认证或认证失败，设置为None
-        g.current_user = None
-        g.current_token = None
-        g.auth_method = None
+        authenticate_request(optional=True)
         return f(*args, **kwargs)
 
     return decorated_function
@@ -83,3 +83,33 @@ def invalidate_user_caches(user_id, invalidate_dashboard=False):
         project_stats_cache.pop(f"user:{user_id}", None)
     except Exception:
         pass
+
+
+def invalidate_api_token_list_cache(user_id):
+    """失效用户 API Token 列表缓存（Redis + 当前进程内存回退缓存）"""
+    if not user_id:
+        return
+
+    client = get_redis_client()
+    if client:
+        client.delete(f"api-tokens:user:{user_id}:list")
+
+    try:
+        from api.api_tokens import api_tokens_fallback_cache
+        api_tokens_fallback_cache.pop(f"user:{user_id}:list", None)
+    except Exception:
+        pass
+
+
+def invalidate_public_context_rules_cache():
+    """失效规则广场公开规则缓存（Redis + 当前进程内存回退缓存）"""
+    client = get_redis_client()
+    if client:
+        _delete_keys_by_pattern(client, "context-rules:public:*")
+
+    try:
+        from api.context_rules import context_rules_fallback_cache
+        for key in [k for k in context_rules_fallback_cache.keys() if k.startswith("public:")]:
+            context_rules_fallback_cache.pop(key, None)
+    except Exception:
+        pass
@@ -3,13 +3,16 @@ GitHub OAuth 配置和服务
 """
 
 import os
-import requests
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, g, current_app
 from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from authlib.integrations.flask_client import OAuth
 from models import User
+from core.http_session import create_pooled_session
+
+# GitHub API 请求复用同一连接池
+_github_http = create_pooled_session()
 
 
 class GitHubConfig:
@@ -78,12 +81,12 @@ class GitHubService:
                 'Accept': 'application/vnd.github.v3+json'
             }
             
-            user_response = requests.get('https://api.github.com/user', headers=headers, timeout=10)
+            user_response = _github_http.get('https://api.github.com/user', headers=headers, timeout=10)
             user_response.raise_for_status()
             user_data = user_response.json()
             
             if not user_data.get('email'):
-                email_response = requests.get('https://api.github.com/user/emails', headers=headers, timeout=10)
+                email_response = _github_http.get('https://api.github.com/user/emails', headers=headers, timeout=10)
                 if email_response.status_code == 200:
                     emails = email_response.json()
                     primary_email = next((email['email'] for email in emails if email['primary']), None)
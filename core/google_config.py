@@ -3,13 +3,16 @@ Google OAuth 配置和服务
 """
 
 import os
-import requests
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, g, current_app
 from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from authlib.integrations.flask_client import OAuth
 from models import User
+from core.http_session import create_pooled_session
+
+# Google API 请求复用同一连接池
+_google_http = create_pooled_session()
 
 
 class GoogleConfig:
@@ -54,7 +57,7 @@ class GoogleService:
                 'Accept': 'application/json'
             }
             
-            user_response = requests.get(
+            user_response = _google_http.get(
                 'https://www.googleapis.com/oauth2/v2/userinfo', 
                 headers=headers, 
                 timeout=10
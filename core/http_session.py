@@ -0,0 +1,25 @@
+"""
+出站 HTTP 连接复用
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_pooled_session(pool_connections=10, pool_maxsize=50):
+    """创建带连接池与 keep-alive 的 requests.Session，进程内复用以省去重复的 TCP/TLS 握手"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset(['GET']),
+        ),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -4,10 +4,15 @@ Flask 中间件配置
 包含请求日志、错误处理、性能监控等中间件
 """
 
+import atexit
+import queue
 import time
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
-from flask import request, g, jsonify
+from flask import request, g, has_request_context, jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from functools import wraps
 
 
@@ -26,9 +31,33 @@ def setup_logging(app):
             format='%(asctime)s %(levelname)s: %(message)s'
         )
 
+    _install_queue_logging()
+
+
+def _install_queue_logging():
+    """根日志改为经队列由后台线程输出，请求线程不再同步格式化与写流"""
+    root = logging.getLogger()
+    if not root.handlers or any(isinstance(h, QueueHandler) for h in root.handlers):
+        return
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    atexit.register(listener.stop)
+
+
+def _count_request_query(conn, cursor, statement, parameters, context, executemany):
+    """按请求累计执行的 SQL 条数"""
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
 
 def setup_request_logging(app):
     """配置请求日志中间件"""
+    if not event.contains(Engine, 'before_cursor_execute', _count_request_query):
+        event.listen(Engine, 'before_cursor_execute', _count_request_query)
+    query_count_threshold = app.config.get('QUERY_COUNT_WARN_THRESHOLD', 0)
 
     @app.before_request
     def before_request():
@@ -99,7 +128,8 @@ def setup_request_logging(app):
                 'content_length': response.headers.get('Content-Length', 'Unknown'),
                 'timestamp': datetime.utcnow().isoformat(),
                 'cache_control': response.headers.get('Cache-Control', 'None'),
-                'location': response.headers.get('Location', 'None')
+                'location': response.headers.get('Location', 'None'),
+                'query_count': g.get('query_count', 0)
             }
 
             # 根据状态码选择日志级别
@@ -122,6 +152,14 @@ def setup_request_logging(app):
             if duration > 1.0:  # 超过1秒的请求
                 app.logger.warning(f"[SLOW_REQUEST] {g.request_id} {request.method} {request.path} - Duration: {duration:.3f}s", extra=response_info)
 
+            # 记录 SQL 条数过多的请求（通常意味着 N+1 查询）
+            if query_count_threshold and response_info['query_count'] > query_count_threshold:
+                app.logger.warning(
+                    f"[QUERY_COUNT] {g.request_id} {request.method} {request.path} - "
+                    f"Queries: {response_info['query_count']}",
+                    extra=response_info
+                )
+
         # 添加响应头
         response.headers['X-Request-ID'] = getattr(g, 'request_id', 'unknown')
         if hasattr(g, 'start_time'):
@@ -134,6 +172,13 @@ def setup_request_logging(app):
 def setup_error_handlers(app):
     """配置错误处理器"""
     
+    from api.base import APIException
+
+    @app.errorhandler(APIException)
+    def api_exception(error):
+        """业务异常（如请求校验失败）转换为对应的错误响应"""
+        return error.to_response()
+    
     @app.errorhandler(400)
     def bad_request(error):
         """400 错误处理"""
@@ -0,0 +1,88 @@
+"""
+固定窗口频率限制
+
+计数放在 Redis（INCR + EXPIRE），多个 gunicorn worker 共享同一限额；
+Redis 不可用时回退到进程内计数，每个客户端只保留当前窗口的一条记录，窗口过期后清理。
+匿名请求按 request.remote_addr 计数，部署在反向代理之后需配置 PROXY_FIX_X_FOR
+"""
+
+import time
+from functools import wraps
+
+from flask import current_app, g, request
+
+from api.base import ApiResponse
+from core.redis_client import get_redis_client
+
+rate_limit_fallback_counters = {}
+# 回退计数的过期清理间隔（秒）
+RATE_LIMIT_FALLBACK_PRUNE_INTERVAL_SECONDS = 60
+_fallback_next_prune_at = 0.0
+
+
+def _client_key():
+    """已认证请求按用户限流，否则按客户端IP"""
+    current_user = getattr(g, 'current_user', None)
+    if current_user is not None:
+        return f"user:{current_user.id}"
+    return f"ip:{request.remote_addr}"
+
+
+def _hit(key, window, window_seconds):
+    """记录一次请求并返回当前窗口内的请求数"""
+    client = get_redis_client()
+    if client:
+        redis_key = f"rate-limit:{key}:{window}"
+        try:
+            pipe = client.pipeline()
+            pipe.incr(redis_key)
+            pipe.expire(redis_key, window_seconds)
+            count, _ = pipe.execute()
+            return int(count)
+        except Exception as e:
+            current_app.logger.warning(f"Rate limit counter unavailable, fallback to memory: {e}")
+
+    now = time.time()
+    _prune_fallback_counters(now)
+
+    # 记录为 (窗口编号, 计数, 窗口结束时间)
+    item = rate_limit_fallback_counters.get(key)
+    if item is None or item[0] != window:
+        item = (window, 0, (window + 1) * window_seconds)
+    item = (window, item[1] + 1, item[2])
+    rate_limit_fallback_counters[key] = item
+    return item[1]
+
+
+def _prune_fallback_counters(now):
+    """定期移除窗口已结束的回退计数，避免每个出现过的客户端永久占用一条记录"""
+    global _fallback_next_prune_at
+    if now < _fallback_next_prune_at:
+        return
+    _fallback_next_prune_at = now + RATE_LIMIT_FALLBACK_PRUNE_INTERVAL_SECONDS
+    for key in [k for k, item in rate_limit_fallback_counters.items() if item[2] <= now]:
+        rate_limit_fallback_counters.pop(key, None)
+
+
+def rate_limit(max_requests, window_seconds, scope=None):
+    """
+    固定窗口频率限制装饰器
+
+    Args:
+        max_requests: 窗口内允许的最大请求数
+        window_seconds: 窗口长度（秒）
+        scope: 限额分组名，默认使用视图函数名；同一视图可叠加多个不同窗口，多个视图也可共用同一分组
+    """
+    def decorator(f):
+        limit_scope = scope or f.__name__
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            window = int(time.time() // window_seconds)
+            key = f"{limit_scope}:{window_seconds}:{_client_key()}"
+            if _hit(key, window, window_seconds) > max_requests:
+                return ApiResponse.error("Too Many Requests", 429).to_response()
+            return f(*args, **kwargs)
+
+        return decorated_function
+    return decorator
@@ -75,3 +75,12 @@ def set_json(key, value, ttl_seconds):
 
     client.setex(key, ttl_seconds, json.dumps(value, default=_json_default))
     return True
+
+
+def delete_keys(*keys):
+    """删除 Redis 中的指定键"""
+    client = get_redis_client()
+    if not client or not keys:
+        return 0
+
+    return client.delete(*keys)
@@ -0,0 +1,63 @@
+"""
+Migration: optimize_api_tokens_indexes
+Description: add user-scoped composite indexes for api token name checks and listing
+Created: 2026-10-17T09:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # create_token/update_token 的重名检查: WHERE user_id = ? AND name = ? AND is_active = 1
+    _create_index_if_missing(
+        connection,
+        "api_tokens",
+        "idx_api_tokens_user_active_name",
+        "CREATE INDEX idx_api_tokens_user_active_name ON api_tokens (user_id, is_active, name)",
+    )
+    # list_tokens: WHERE user_id = ? ORDER BY created_at DESC（InnoDB 反向扫描即可满足 DESC）
+    _create_index_if_missing(
+        connection,
+        "api_tokens",
+        "idx_api_tokens_user_created_at",
+        "CREATE INDEX idx_api_tokens_user_created_at ON api_tokens (user_id, created_at)",
+    )
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "api_tokens", "idx_api_tokens_user_active_name")
+    _drop_index_if_exists(connection, "api_tokens", "idx_api_tokens_user_created_at")
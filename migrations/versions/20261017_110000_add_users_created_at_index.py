@@ -0,0 +1,55 @@
+"""
+Migration: add_users_created_at_index
+Description: add (created_at, id) index on users for keyset pagination of the admin user list
+Created: 2026-10-17T11:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # list_users 游标分页: ORDER BY created_at DESC, id DESC
+    _create_index_if_missing(
+        connection,
+        "users",
+        "idx_users_created_at_id",
+        "CREATE INDEX idx_users_created_at_id ON users (created_at, id)",
+    )
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "users", "idx_users_created_at_id")
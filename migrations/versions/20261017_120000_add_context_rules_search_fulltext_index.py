@@ -0,0 +1,55 @@
+"""
+Migration: add_context_rules_search_fulltext_index
+Description: add a FULLTEXT index on context_rules(name, description, content) for rule search
+Created: 2026-10-17T12:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # list_context_rules 的 search 参数: MATCH (name, description, content) AGAINST (... IN BOOLEAN MODE)
+    _create_index_if_missing(
+        connection,
+        "context_rules",
+        "ft_context_rules_search",
+        "CREATE FULLTEXT INDEX ft_context_rules_search ON context_rules (name, description, content)",
+    )
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "context_rules", "ft_context_rules_search")
@@ -0,0 +1,60 @@
+"""
+Migration: add_context_rules_priority_index
+Description: add context_rules(user_id, is_active, priority, created_at) for ordered merged/preview rule reads
+Created: 2026-10-17T13:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # build_context_and_rules / get_applicable_rules:
+    # WHERE user_id = ? AND is_active = 1 AND (project_id IS NULL OR project_id = ?)
+    # ORDER BY priority DESC, created_at DESC
+    # 等值列在前、排序列在后，可按索引反向扫描直接得到有序结果，省去 filesort；
+    # project_id 的 OR 条件在扫描过程中过滤（MySQL 不支持 INCLUDE 列，content 为 TEXT 也无法进入索引）
+    _create_index_if_missing(
+        connection,
+        "context_rules",
+        "idx_context_rules_user_active_priority",
+        "CREATE INDEX idx_context_rules_user_active_priority "
+        "ON context_rules (user_id, is_active, priority, created_at)",
+    )
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "context_rules", "idx_context_rules_user_active_priority")
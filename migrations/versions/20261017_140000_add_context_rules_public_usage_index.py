@@ -0,0 +1,58 @@
+"""
+Migration: add_context_rules_public_usage_index
+Description: add context_rules(is_public, is_active, usage_count, id) for marketplace keyset pagination
+Created: 2026-10-17T14:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # 规则广场: WHERE is_public = 1 AND is_active = 1
+    # ORDER BY usage_count DESC, id DESC，游标分页再加 (usage_count, id) < (?, ?) 范围条件
+    # 深分页也只需一次索引定位，不再随 OFFSET 线性扫描
+    _create_index_if_missing(
+        connection,
+        "context_rules",
+        "idx_context_rules_public_usage",
+        "CREATE INDEX idx_context_rules_public_usage "
+        "ON context_rules (is_public, is_active, usage_count, id)",
+    )
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "context_rules", "idx_context_rules_public_usage")
@@ -0,0 +1,66 @@
+"""
+Migration: add_context_rules_list_indexes
+Description: add context_rules(user_id, created_at) and (user_id, project_id, created_at) for the rule list endpoint
+Created: 2026-10-17T15:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # list_context_rules 默认按 created_at 倒序分页：
+    # WHERE user_id = ? [AND project_id = ?] [AND is_active = ?] ORDER BY created_at DESC LIMIT ?
+    # 两个索引分别覆盖不带/带项目筛选的情况，按索引反向扫描取前 N 行即可，省去 filesort；
+    # is_active/apply_to_* 等低选择性筛选在扫描过程中过滤。name/updated_at 排序使用较少，不单独建索引
+    _create_index_if_missing(
+        connection,
+        "context_rules",
+        "idx_context_rules_user_created",
+        "CREATE INDEX idx_context_rules_user_created ON context_rules (user_id, created_at)",
+    )
+    _create_index_if_missing(
+        connection,
+        "context_rules",
+        "idx_context_rules_user_project_created",
+        "CREATE INDEX idx_context_rules_user_project_created "
+        "ON context_rules (user_id, project_id, created_at)",
+    )
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "context_rules", "idx_context_rules_user_project_created")
+    _drop_index_if_exists(connection, "context_rules", "idx_context_rules_user_created")
@@ -0,0 +1,60 @@
+"""
+Migration: add_custom_prompts_list_index
+Description: add custom_prompts(user_id, prompt_type, is_active, order_index, created_at) for ordered prompt lists
+Created: 2026-10-17T16:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # get_custom_prompts:
+    # WHERE user_id = ? AND prompt_type = ? AND is_active = ?
+    # ORDER BY order_index ASC, created_at DESC, id DESC
+    # 等值列在前、排序列在后，游标分页可从索引位置直接继续扫描；
+    # 同类型重名检查 (user_id, prompt_type, name) 也可先按索引前缀缩小范围
+    _create_index_if_missing(
+        connection,
+        "custom_prompts",
+        "idx_custom_prompts_user_type_active_order",
+        "CREATE INDEX idx_custom_prompts_user_type_active_order "
+        "ON custom_prompts (user_id, prompt_type, is_active, order_index, created_at)",
+    )
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "custom_prompts", "idx_custom_prompts_user_type_active_order")
@@ -0,0 +1,78 @@
+"""
+Migration: add_custom_prompts_unique_name
+Description: add unique key custom_prompts(user_id, prompt_type, name) so duplicate names are rejected by the database
+Created: 2026-10-17T17:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # 创建提示词时不再先查重，直接依赖唯一约束；
+    # 历史上并发创建可能留下重名记录，保留每组 id 最小的一条，其余名称追加 " #id" 后再建唯一索引
+    renamed = connection.execute(
+        text(
+            """
+            UPDATE custom_prompts p
+            JOIN (
+                SELECT user_id, prompt_type, name, MIN(id) AS keep_id
+                FROM custom_prompts
+                GROUP BY user_id, prompt_type, name
+                HAVING COUNT(1) > 1
+            ) d
+              ON d.user_id = p.user_id
+             AND d.prompt_type = p.prompt_type
+             AND d.name = p.name
+             AND p.id <> d.keep_id
+            SET p.name = CONCAT(LEFT(p.name, 240), ' #', p.id)
+            """
+        )
+    ).rowcount
+    if renamed:
+        print(f"Renamed duplicate custom prompts: {renamed}")
+
+    _create_index_if_missing(
+        connection,
+        "custom_prompts",
+        "uq_custom_prompts_user_type_name",
+        "CREATE UNIQUE INDEX uq_custom_prompts_user_type_name "
+        "ON custom_prompts (user_id, prompt_type, name)",
+    )
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "custom_prompts", "uq_custom_prompts_user_type_name")
@@ -0,0 +1,73 @@
+"""
+Migration: rebuild_context_rules_search_fulltext_index_ngram
+Description: rebuild the context_rules FULLTEXT search index with the ngram parser so Chinese and substring searches keep matching
+Created: 2026-10-18T11:00:00
+"""
+
+from sqlalchemy import text
+
+
+def _index_exists(connection, table_name, index_name):
+    result = connection.execute(
+        text(
+            """
+            SELECT COUNT(1) AS cnt
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = :table_name
+              AND index_name = :index_name
+            """
+        ),
+        {"table_name": table_name, "index_name": index_name},
+    ).scalar()
+    return bool(result)
+
+
+def _create_index_if_missing(connection, table_name, index_name, ddl):
+    if _index_exists(connection, table_name, index_name):
+        print(f"Index already exists, skip: {index_name}")
+        return
+    connection.execute(text(ddl))
+    print(f"Created index: {index_name}")
+
+
+def _drop_index_if_exists(connection, table_name, index_name):
+    if not _index_exists(connection, table_name, index_name):
+        print(f"Index not found, skip drop: {index_name}")
+        return
+    connection.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+    print(f"Dropped index: {index_name}")
+
+
+def _create_ngram_fulltext_index(connection, table_name, index_name, columns):
+    # 停用词表在建索引时绑定：ngram 会丢弃含停用词的 n-gram（如含 "a"、"i" 的二元组），因此建索引时关闭
+    enable_stopword = connection.execute(text("SELECT @@SESSION.innodb_ft_enable_stopword")).scalar()
+    connection.execute(text("SET SESSION innodb_ft_enable_stopword = OFF"))
+    try:
+        connection.execute(text(
+            f"CREATE FULLTEXT INDEX {index_name} ON {table_name} ({columns}) WITH PARSER ngram"
+        ))
+    finally:
+        connection.execute(
+            text("SET SESSION innodb_ft_enable_stopword = :value"),
+            {"value": int(enable_stopword)},
+        )
+    print(f"Created index: {index_name}")
+
+
+def upgrade(connection):
+    """执行迁移"""
+    # 规则搜索/规则广场的 search 参数: MATCH (name, description, content) AGAINST ('+"term"' IN BOOLEAN MODE)，按 ngram 子串匹配，中文无需空格分词
+    _drop_index_if_exists(connection, "context_rules", "ft_context_rules_search")
+    _create_ngram_fulltext_index(connection, "context_rules", "ft_context_rules_search", "name, description, content")
+
+
+def downgrade(connection):
+    """回滚迁移"""
+    _drop_index_if_exists(connection, "context_rules", "ft_context_rules_search")
+    _create_index_if_missing(
+        connection,
+        "context_rules",
+        "ft_context_rules_search",
+        "CREATE FULLTEXT INDEX ft_context_rules_search ON context_rules (name, description, content)",
+    )
@@ -8,9 +8,9 @@ from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 import base64
 import os
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, or_
 from sqlalchemy.orm import relationship
-from .base import BaseModel
+from .base import BaseModel, db
 
 
 class ApiToken(BaseModel):
@@ -111,29 +111,28 @@ class ApiToken(BaseModel):
         return api_token, token
     
     @classmethod
-    def verify_token(cls, token):
-        """验证Token"""
+    def verify_token(cls, token, token_hash=None):
+        """验证Token（token_hash 为调用方已计算好的 sha256 时可直接传入）"""
         if not token:
             return None
         
         # 计算token哈希值
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        if token_hash is None:
+            token_hash = hashlib.sha256(token.encode()).hexdigest()
         
-        # 查找token
-        api_token = cls.query.filter_by(
-            token_hash=token_hash,
-            is_active=True
+        # 按唯一索引查找token，过期判断一并下推到查询条件
+        now = datetime.utcnow()
+        api_token = cls.query.filter(
+            cls.token_hash == token_hash,
+            cls.is_active.is_(True),
+            or_(cls.expires_at.is_(None), cls.expires_at >= now)
         ).first()
         
         if not api_token:
             return None
         
-        # 检查是否过期
-        if api_token.expires_at and api_token.expires_at < datetime.utcnow():
-            return None
-        
         # 更新使用统计
-        api_token.last_used_at = datetime.utcnow()
+        api_token.last_used_at = now
         api_token.usage_count += 1
         api_token.save()
         
@@ -177,12 +176,11 @@ class ApiToken(BaseModel):
     @classmethod
     def cleanup_expired(cls):
         """清理过期的Token"""
-        expired_tokens = cls.query.filter(
+        # 单条 UPDATE 批量停用，避免逐行加载并逐行提交
+        count = cls.query.filter(
             cls.expires_at < datetime.utcnow(),
             cls.is_active == True
-        ).all()
-        
-        for token in expired_tokens:
-            token.deactivate()
-        
-        return len(expired_tokens)
+        ).update({cls.is_active: False}, synchronize_session=False)
+        db.session.commit()
+
+        return count
@@ -2,13 +2,68 @@
 数据库基础配置和通用模型
 """
 
+import operator
+import re
 from datetime import datetime
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import Column, Integer, DateTime, String
+from sqlalchemy.dialects.mysql import match as mysql_match
+from sqlalchemy.orm import raiseload
 
 # 创建数据库实例
 db = SQLAlchemy()
 
+# 各模型 to_dict 的 (列名元组, attrgetter) 缓存，表结构在进程内不变
+_to_dict_getters = {}
+
+
+def _to_dict_getter(model_class):
+    cached = _to_dict_getters.get(model_class)
+    if cached is None:
+        names = tuple(column.name for column in model_class.__table__.columns)
+        cached = (names, operator.attrgetter(*names))
+        _to_dict_getters[model_class] = cached
+    return cached
+
+
+def strict_loading_options():
+    """
+    附加在显式预加载选项之后：其余关系禁止懒加载，避免悄悄退化为 N+1；
+    STRICT_LOADING 关闭时（生产环境默认）不附加，交由请求 SQL 计数告警兜底
+    """
+    if current_app.config.get('STRICT_LOADING', False):
+        return (raiseload('*'),)
+    return ()
+
+
+# ngram 全文索引的切分长度（MySQL 默认 ngram_token_size=2），更短的关键词无法命中索引
+NGRAM_TOKEN_SIZE = 2
+# 只有字母、数字、中文等单词字符组成的关键词走全文索引；含标点（如邮箱的 @ .）的输入回退到 LIKE
+_NGRAM_TERM_RE = re.compile(r'[^\W_]+')
+
+
+def ngram_match_filter(columns, search):
+    """
+    基于 ngram 全文索引的搜索条件，无法等价使用全文索引时返回 None，由调用方回退到 LIKE
+
+    按空白切分关键词，每个词以短语 +"term" 必须出现；ngram 索引下短语即连续字符，
+    与 LIKE '%term%' 一样是子串匹配，对中文同样有效。索引需以 WITH PARSER ngram
+    并关闭停用词创建，否则含停用词的 n-gram 不进索引
+    """
+    if db.engine.dialect.name != 'mysql':
+        return None
+    terms = search.split()
+    if not terms or not all(
+        len(term) >= NGRAM_TOKEN_SIZE and _NGRAM_TERM_RE.fullmatch(term)
+        for term in terms
+    ):
+        return None
+    return mysql_match(
+        *columns,
+        against=' '.join(f'+"{term}"' for term in terms)
+    ).in_boolean_mode()
+
 
 class BaseModel(db.Model):
     """基础模型类，包含通用字段"""
@@ -28,15 +83,20 @@ class BaseModel(db.Model):
     
     def to_dict(self, exclude=None):
         """转换为字典格式"""
-        exclude = exclude or []
+        names, getter = _to_dict_getter(type(self))
+        if exclude:
+            # 被排除的列不读取，避免触发延迟加载
+            names = tuple(name for name in names if name not in exclude)
+            values = [getattr(self, name) for name in names]
+        else:
+            # 一次 attrgetter 调用取出全部列值
+            values = getter(self)
         result = {}
         
-        for column in self.__table__.columns:
-            if column.name not in exclude:
-                value = getattr(self, column.name)
-                if isinstance(value, datetime):
-                    value = value.isoformat()
-                result[column.name] = value
+        for name, value in zip(names, values):
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            result[name] = value
                 
         return result
     
@@ -2,11 +2,18 @@
 上下文规则模型
 """
 
+from datetime import datetime
 from sqlalchemy import Column, String, Text, Integer, ForeignKey, Boolean, or_
-from sqlalchemy.orm import relationship
-from .base import BaseModel
+from sqlalchemy.orm import relationship, selectinload
+from .base import BaseModel, ngram_match_filter, strict_loading_options
+from .project import Project
+from .user import User
 from . import db
 
+# 规则广场列表输出的项目/作者字段，与 to_dict(include_project=True, include_user=True) 一致
+_PUBLIC_RULE_PROJECT_FIELDS = ('id', 'name', 'color')
+_PUBLIC_RULE_USER_FIELDS = ('id', 'username', 'full_name', 'avatar_url', 'github_id', 'provider')
+
 
 class ContextRule(BaseModel):
     """上下文规则模型"""
@@ -38,9 +45,9 @@ class ContextRule(BaseModel):
         scope = 'Global' if self.project_id is None else f'Project {self.project_id}'
         return f'<ContextRule {self.id}: {self.name} ({scope})>'
     
-    def to_dict(self, include_project=False, include_user=False):
+    def to_dict(self, include_project=False, include_user=False, exclude=None):
         """转换为字典"""
-        result = super().to_dict()
+        result = super().to_dict(exclude=exclude)
         result['is_global'] = self.project_id is None
 
         if include_project and self.project:
@@ -91,41 +98,53 @@ class ContextRule(BaseModel):
         return query.order_by(cls.priority.desc(), cls.created_at.asc()).all()
     
     @classmethod
-    def get_applicable_rules(cls, project_id=None, user_id=None, for_tasks=True, for_projects=False):
-        """获取适用的规则（全局 + 项目级别）"""
-        rules = []
-
-        # 获取全局规则
-        global_query = cls.query.filter_by(project_id=None, is_active=True)
+    def _applicable_rules_query(cls, project_id=None, user_id=None, for_tasks=True, for_projects=False):
+        """适用规则查询（全局 + 项目级别），按优先级、创建时间倒序"""
+        query = cls.query.filter_by(is_active=True)
+        if project_id:
+            query = query.filter(or_(cls.project_id.is_(None), cls.project_id == project_id))
+        else:
+            query = query.filter(cls.project_id.is_(None))
         if user_id is not None:
-            global_query = global_query.filter_by(user_id=user_id)
+            query = query.filter_by(user_id=user_id)
         if for_tasks:
-            global_query = global_query.filter_by(apply_to_tasks=True)
+            query = query.filter_by(apply_to_tasks=True)
         if for_projects:
-            global_query = global_query.filter_by(apply_to_projects=True)
+            query = query.filter_by(apply_to_projects=True)
 
-        rules.extend(global_query.all())
+        return query.order_by(cls.priority.desc(), cls.created_at.desc())
+
+    @classmethod
+    def get_applicable_rules(cls, project_id=None, user_id=None, for_tasks=True, for_projects=False):
+        """获取适用的规则（全局 + 项目级别）"""
+        return cls._applicable_rules_query(project_id, user_id, for_tasks, for_projects).all()
+
+    @classmethod
+    def build_context_and_rules(cls, project_id=None, user_id=None, for_tasks=True, for_projects=False):
+        """
+        一次查询同时得到上下文字符串与范围内全部启用的规则（已预加载项目）
+
+        返回的规则列表不按 apply_to_* 过滤；上下文字符串只拼接其中
+        满足 for_tasks/for_projects 的规则，与 build_context_string 结果一致
+        """
+        rules = cls._applicable_rules_query(
+            project_id, user_id, for_tasks=False, for_projects=False
+        ).options(selectinload(cls.project), *strict_loading_options()).all()
+        context_rules = [
+            rule for rule in rules
+            if (not for_tasks or rule.apply_to_tasks) and (not for_projects or rule.apply_to_projects)
+        ]
+        return cls.format_context_string(context_rules), rules
 
-        # 获取项目规则
-        if project_id:
-            project_query = cls.query.filter_by(project_id=project_id, is_active=True)
-            if user_id is not None:
-                project_query = project_query.filter_by(user_id=user_id)
-            if for_tasks:
-                project_query = project_query.filter_by(apply_to_tasks=True)
-            if for_projects:
-                project_query = project_query.filter_by(apply_to_projects=True)
-
-            rules.extend(project_query.all())
-
-        # 按优先级排序
-        return sorted(rules, key=lambda r: (r.priority, r.created_at), reverse=True)
-    
     @classmethod
     def build_context_string(cls, project_id=None, user_id=None, for_tasks=True, for_projects=False):
         """构建上下文字符串"""
         rules = cls.get_applicable_rules(project_id, user_id, for_tasks, for_projects)
+        return cls.format_context_string(rules)
 
+    @staticmethod
+    def format_context_string(rules):
+        """将已排序的规则拼接为上下文字符串"""
         if not rules:
             return ""
 
@@ -160,37 +179,70 @@ class ContextRule(BaseModel):
         self.save()
 
     @classmethod
-    def get_public_rules(cls, search=None, sort_by='usage_count', sort_order='desc', page=1, per_page=20):
-        """获取公开的规则（规则广场）"""
-        query = cls.query.filter_by(is_public=True, is_active=True)
+    def search_filter(cls, search):
+        """规则搜索条件：MySQL 上优先使用 context_rules 的 ngram 全文索引做子串匹配（中文适用），其他情况回退到 LIKE"""
+        condition = ngram_match_filter((cls.name, cls.description, cls.content), search)
+        if condition is not None:
+            return condition
+
+        search_term = f"%{search}%"
+        return or_(
+            cls.name.ilike(search_term),
+            cls.description.ilike(search_term),
+            cls.content.ilike(search_term)
+        )
+
+    @classmethod
+    def public_rules_query(cls, search=None):
+        """
+        规则广场公开规则的筛选查询（未排序、未分页）
+
+        只按列查询，连接项目与作者取得列表需要的字段，一条 SQL 返回行元组，
+        不实例化 ORM 对象；结果行由 public_row_to_dict 转换为响应字典
+        """
+        columns = [
+            *cls.__table__.columns,
+            *(getattr(Project, field).label(f'project__{field}') for field in _PUBLIC_RULE_PROJECT_FIELDS),
+            *(getattr(User, field).label(f'user__{field}') for field in _PUBLIC_RULE_USER_FIELDS),
+        ]
+        query = db.session.query(*columns).outerjoin(
+            Project, Project.id == cls.project_id
+        ).outerjoin(
+            User, User.id == cls.user_id
+        ).filter(cls.is_public.is_(True), cls.is_active.is_(True))
 
         # 搜索功能
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    cls.name.ilike(search_term),
-                    cls.description.ilike(search_term),
-                    cls.content.ilike(search_term)
-                )
-            )
-
-        # 排序
-        if sort_by == 'usage_count':
-            if sort_order == 'desc':
-                query = query.order_by(cls.usage_count.desc())
-            else:
-                query = query.order_by(cls.usage_count.asc())
-        elif sort_by == 'created_at':
-            if sort_order == 'desc':
-                query = query.order_by(cls.created_at.desc())
-            else:
-                query = query.order_by(cls.created_at.asc())
-        elif sort_by == 'updated_at':
-            if sort_order == 'desc':
-                query = query.order_by(cls.updated_at.desc())
-            else:
-                query = query.order_by(cls.updated_at.asc())
+            query = query.filter(cls.search_filter(search))
+        return query
+
+    @classmethod
+    def public_row_to_dict(cls, row):
+        """public_rules_query 结果行转换为字典，结构与 to_dict(include_project=True, include_user=True) 一致"""
+        mapping = row._mapping
+        result = {}
+        for column in cls.__table__.columns:
+            value = mapping[column.name]
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            result[column.name] = value
+        result['is_global'] = result['project_id'] is None
+
+        if mapping['project__id'] is not None:
+            result['project'] = {field: mapping[f'project__{field}'] for field in _PUBLIC_RULE_PROJECT_FIELDS}
+        if mapping['user__id'] is not None:
+            result['user'] = {field: mapping[f'user__{field}'] for field in _PUBLIC_RULE_USER_FIELDS}
+        return result
+
+    @classmethod
+    def get_public_rules(cls, search=None, sort_by='usage_count', sort_order='desc', page=1, per_page=20):
+        """获取公开的规则（规则广场）"""
+        query = cls.public_rules_query(search)
+
+        # 排序（不支持的字段不排序）
+        order_column = _PUBLIC_RULE_SORT_COLUMNS.get(sort_by)
+        if order_column is not None:
+            query = query.order_by(order_column.desc() if sort_order == 'desc' else order_column.asc())
 
         # 分页
         return query.paginate(
@@ -203,8 +255,9 @@ class ContextRule(BaseModel):
         """复制规则给指定用户"""
         from models import db
 
-        # 增加原规则的使用次数
-        self.increment_usage_count()
+        # 增加原规则的使用次数：以 SQL 表达式自增，随新规则在同一事务中提交，
+        # 避免读改写丢失并发计数，也省去一次单独的提交
+        self.usage_count = ContextRule.usage_count + 1
 
         # 创建新规则
         new_rule = ContextRule(
@@ -236,3 +289,11 @@ class ContextRule(BaseModel):
             return f"项目: {self.project.name}"
         else:
             return f"项目 ID: {self.project_id}"
+
+
+# 规则广场允许的排序字段
+_PUBLIC_RULE_SORT_COLUMNS = {
+    'usage_count': ContextRule.usage_count,
+    'created_at': ContextRule.created_at,
+    'updated_at': ContextRule.updated_at,
+}
@@ -3,8 +3,8 @@
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, UniqueConstraint, insert
+from sqlalchemy.orm import defer, relationship
 from models import db
 import enum
 
@@ -18,6 +18,9 @@ class PromptType(enum.Enum):
 class CustomPrompt(db.Model):
     """自定义提示词模型"""
     __tablename__ = 'custom_prompts'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'prompt_type', 'name', name='uq_custom_prompts_user_type_name'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
@@ -38,20 +41,21 @@ class CustomPrompt(db.Model):
     def __repr__(self):
         return f'<CustomPrompt {self.id}: {self.name} ({self.prompt_type.value})>'
 
-    def to_dict(self, include_user=False):
-        """转换为字典格式"""
+    def to_dict(self, include_user=False, include_content=True):
+        """转换为字典格式（include_content=False 时不读取 content，可配合 defer 使用）"""
         result = {
             'id': self.id,
             'user_id': self.user_id,
             'prompt_type': self.prompt_type.value,
             'name': self.name,
-            'content': self.content,
             'description': self.description,
             'is_active': self.is_active,
             'order_index': self.order_index,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        if include_content:
+            result['content'] = self.content
         
         if include_user and self.user:
             result['user'] = {
@@ -63,9 +67,11 @@ class CustomPrompt(db.Model):
         return result
 
     @classmethod
-    def get_user_prompts(cls, user_id, prompt_type=None, is_active=None):
-        """获取用户的提示词列表"""
+    def get_user_prompts(cls, user_id, prompt_type=None, is_active=None, include_content=True):
+        """获取用户的提示词列表（include_content=False 时不查询 content 列）"""
         query = cls.query.filter(cls.user_id == user_id)
+        if not include_content:
+            query = query.options(defer(cls.content))
         
         if prompt_type:
             query = query.filter(cls.prompt_type == prompt_type)
@@ -76,14 +82,14 @@ class CustomPrompt(db.Model):
         return query.order_by(cls.order_index.asc(), cls.created_at.desc()).all()
 
     @classmethod
-    def get_user_project_prompts(cls, user_id, is_active=True):
+    def get_user_project_prompts(cls, user_id, is_active=True, include_content=True):
         """获取用户的项目提示词列表"""
-        return cls.get_user_prompts(user_id, PromptType.PROJECT, is_active)
+        return cls.get_user_prompts(user_id, PromptType.PROJECT, is_active, include_content)
 
     @classmethod
-    def get_user_task_button_prompts(cls, user_id, is_active=True):
+    def get_user_task_button_prompts(cls, user_id, is_active=True, include_content=True):
         """获取用户的任务按钮提示词列表"""
-        return cls.get_user_prompts(user_id, PromptType.TASK_BUTTON, is_active)
+        return cls.get_user_prompts(user_id, PromptType.TASK_BUTTON, is_active, include_content)
 
     @classmethod
     def create_prompt(cls, user_id, prompt_type, name, content, description=None, order_index=0):
@@ -241,26 +247,25 @@ ${tasks.list}
             project_name = '默认项目模板'
             project_description = '默认的项目上下文提示词模板'
 
-        # 创建默认项目提示词
-        project_prompt = cls.create_prompt(
-            user_id=user_id,
-            prompt_type=PromptType.PROJECT,
-            name=project_name,
-            content=cls.get_default_project_template(language),
-            description=project_description
-        )
-
-        # 创建默认任务按钮提示词
-        default_buttons = cls.get_default_task_buttons(language)
-        for button_data in default_buttons:
-            cls.create_prompt(
-                user_id=user_id,
-                prompt_type=PromptType.TASK_BUTTON,
-                name=button_data['name'],
-                content=button_data['content'],
-                description=button_data['description'],
-                order_index=button_data['order_index']
-            )
+        # 默认项目提示词与任务按钮提示词一次 executemany 写入（无需取回主键，避免逐条 INSERT）
+        rows = [{
+            'user_id': user_id,
+            'prompt_type': PromptType.PROJECT,
+            'name': project_name,
+            'content': cls.get_default_project_template(language),
+            'description': project_description,
+            'order_index': 0,
+        }]
+        for button_data in cls.get_default_task_buttons(language):
+            rows.append({
+                'user_id': user_id,
+                'prompt_type': PromptType.TASK_BUTTON,
+                'name': button_data['name'],
+                'content': button_data['content'],
+                'description': button_data['description'],
+                'order_index': button_data['order_index'],
+            })
+        db.session.execute(insert(cls.__table__), rows)
 
         db.session.commit()
         return True
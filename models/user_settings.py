@@ -5,9 +5,11 @@
 用于存储用户的个人设置和偏好
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+import json
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, func, update
 from sqlalchemy.orm import relationship
-from models.base import BaseModel
+from models.base import BaseModel, db
 
 
 class UserSettings(BaseModel):
@@ -48,6 +50,25 @@ class UserSettings(BaseModel):
             settings.save()
         return settings
     
+    @classmethod
+    def set_settings_key(cls, user_id, key, value):
+        """
+        只改写 settings_data 中的一个顶层键，返回受影响行数（用户设置不存在时为 0）
+
+        由数据库 JSON_SET 就地修改，不必先读出整个 settings_data 再整体写回；
+        值经 JSON_EXTRACT(:v, '$') 转为 JSON 类型，避免被当作字符串写入
+        """
+        result = db.session.execute(
+            update(cls).where(cls.user_id == user_id).values(
+                settings_data=func.json_set(
+                    func.coalesce(cls.settings_data, func.json_object()),
+                    f'$.{key}',
+                    func.json_extract(json.dumps(value), '$'),
+                ),
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
     def update_language(self, language):
         """更新语言设置"""
         if language in ['zh-CN', 'en']: